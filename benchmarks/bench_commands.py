@@ -0,0 +1,297 @@
+"""Load time, memory and per-command latency against catalog size.
+
+Generates a catalog for each size, loads it, then runs every kind of
+command through CommandParser and times each call. Results are printed
+as a table on stderr and written as JSON, so runs can be kept and
+compared. Run from the repository root with:
+
+    python3 -m benchmarks.bench_commands [size ...] [--repeat N]
+        [--mode eager|lazy|snapshot] [--zipf S] [--mixed COUNT]
+        [--cache-entries N] [--no-memory] [--output FILE]
+        [--baseline FILE [--tolerance FRACTION]]
+
+--zipf gives the catalog's tags Zipfian popularity, and --mixed also
+times a generated script of COUNT commands in a realistic mix. The search
+result cache is off unless --cache-entries is given, so the SEARCH
+latencies measure the search indexes rather than cache hits.
+
+With --baseline, every p50 latency and load time is compared with the
+same measurement in an earlier JSON result, and the exit status is 1 if
+any is slower by more than the tolerance.
+"""
+
+from .synthetic import ZipfPicker, generate_commands, write_catalog
+from src.catalog_snapshot import compile_snapshot
+from src.command_parser import CommandParser
+from src.output_sink import CollectorSink
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+from pathlib import Path
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SEARCH_TERMS = ("cat", "python tutorial", "highlights news 1", "zzz")
+
+# Commands that print the whole catalog run at most this many times.
+FULL_LISTING_REPEAT = 3
+
+
+def _workload(size, repeat, zipf=0.0, seed=0):
+    """Returns (name, command) pairs covering every command.
+
+    Args:
+        size: The number of videos in the catalog.
+        repeat: Roughly how many times each command is run.
+        zipf: The Zipf exponent of the catalog's tag popularity.
+        seed: The random seed for picked videos, tags and terms.
+    """
+    rng = random.Random(seed)
+    pick_tag = ZipfPicker(rng, 1000, zipf)
+
+    def video_id():
+        return f"video_{rng.randrange(size)}"
+
+    commands = [("NUMBER_OF_VIDEOS", ["NUMBER_OF_VIDEOS"])] * repeat
+    commands += [("SHOW_ALL_VIDEOS", ["SHOW_ALL_VIDEOS"])] * min(
+        repeat, FULL_LISTING_REPEAT)
+    for _ in range(repeat):
+        commands.append(("PLAY", ["PLAY", video_id()]))
+        commands.append(("PLAY_RANDOM", ["PLAY_RANDOM"]))
+        commands.append(("SHOW_PLAYING", ["SHOW_PLAYING"]))
+        commands.append(("SEARCH_VIDEOS",
+                         ["SEARCH_VIDEOS", rng.choice(SEARCH_TERMS)]))
+        commands.append(("SEARCH_VIDEOS_WITH_TAG",
+                         ["SEARCH_VIDEOS_WITH_TAG",
+                          f"#tag{pick_tag()}"]))
+        flagged = video_id()
+        commands.append(("FLAG_VIDEO", ["FLAG_VIDEO", flagged, "bench"]))
+        commands.append(("ALLOW_VIDEO", ["ALLOW_VIDEO", flagged]))
+    commands.append(("STOP", ["STOP"]))
+
+    playlist_ids = [video_id() for _ in range(repeat)]
+    commands.append(("CREATE_PLAYLIST", ["CREATE_PLAYLIST", "bench"]))
+    commands += [("ADD_TO_PLAYLIST", ["ADD_TO_PLAYLIST", "bench", i])
+                 for i in playlist_ids]
+    commands += [("SHOW_PLAYLIST", ["SHOW_PLAYLIST", "bench"])] * min(
+        repeat, FULL_LISTING_REPEAT)
+    commands += [("SHOW_ALL_PLAYLISTS", ["SHOW_ALL_PLAYLISTS"])] * repeat
+    commands += [("REMOVE_FROM_PLAYLIST",
+                  ["REMOVE_FROM_PLAYLIST", "bench", i])
+                 for i in playlist_ids[:repeat // 2]]
+    commands.append(("CLEAR_PLAYLIST", ["CLEAR_PLAYLIST", "bench"]))
+    commands.append(("DELETE_PLAYLIST", ["DELETE_PLAYLIST", "bench"]))
+    return commands
+
+
+def _percentile(samples, fraction):
+    """Returns the nearest-rank percentile of sorted samples."""
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def _summarise(samples):
+    samples.sort()
+    return {
+        "calls": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1e3,
+        "p50_ms": _percentile(samples, 0.50) * 1e3,
+        "p95_ms": _percentile(samples, 0.95) * 1e3,
+        "p99_ms": _percentile(samples, 0.99) * 1e3,
+        "max_ms": samples[-1] * 1e3,
+    }
+
+
+def _open_library(path, mode, cache_entries=0):
+    if mode == "lazy":
+        return VideoLibrary(path, lazy=True, cache_entries=cache_entries)
+    if mode == "snapshot":
+        return VideoLibrary(path, snapshot=True, cache_entries=cache_entries)
+    return VideoLibrary(path, cache_entries=cache_entries)
+
+
+def _measure_memory(path, mode, cache_entries):
+    tracemalloc.start()
+    library = _open_library(path, mode, cache_entries)
+    library.search_titles("cat")
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del library
+    return size
+
+
+def _time_commands(parser, sink, commands):
+    """Runs (name, command) pairs, returning each name's call times."""
+    samples = {}
+    clock = time.perf_counter
+    for name, command in commands:
+        start = clock()
+        parser.execute_command(command)
+        elapsed = clock() - start
+        samples.setdefault(name, []).append(elapsed)
+        sink.lines.clear()
+    return samples
+
+
+def run_size(directory, size, repeat, mode="eager", memory=True, zipf=0.0,
+             mixed=0, cache_entries=0):
+    """Benchmarks one catalog size.
+
+    Args:
+        directory: Where to write the generated catalog.
+        size: The number of videos.
+        repeat: Roughly how many times each command is run.
+        mode: How the library loads the catalog: eager, lazy or snapshot.
+        memory: Whether to load the catalog again under tracemalloc.
+        zipf: The Zipf exponent of tag, and mixed script video, popularity.
+        mixed: The length of a generated mixed script to time, 0 for none.
+        cache_entries: The size of the search result cache, 0 for none.
+
+    Returns:
+        A dict of the measurements for this size.
+    """
+    path = Path(directory) / f"videos_{size}.txt"
+    write_catalog(path, size, zipf=zipf)
+    if mode == "snapshot":
+        compile_snapshot(path)
+
+    start = time.perf_counter()
+    library = _open_library(path, mode, cache_entries)
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    library.search_titles("cat")
+    index_seconds = time.perf_counter() - start
+
+    sink = CollectorSink()
+    player = VideoPlayer(library, read_answer=lambda: "No", sink=sink)
+    parser = CommandParser(player)
+    samples = _time_commands(parser, sink, _workload(size, repeat, zipf))
+    run = {
+        "size": size,
+        "load_seconds": load_seconds,
+        "index_seconds": index_seconds,
+        "commands": {name: _summarise(times)
+                     for name, times in samples.items()},
+    }
+    if mixed:
+        script = generate_commands(mixed, size, zipf=zipf)
+        start = time.perf_counter()
+        samples = _time_commands(
+            parser, sink, ((line.split()[0], line.split()) for line in script))
+        run["mixed_seconds"] = time.perf_counter() - start
+        run["mixed"] = {name: _summarise(times)
+                        for name, times in samples.items()}
+    del player, parser, library
+    run["memory_bytes"] = \
+        _measure_memory(path, mode, cache_entries) if memory else None
+    return run
+
+
+def compare(results, baseline, tolerance):
+    """Lists measurements slower than in a baseline run.
+
+    Args:
+        results: The results dict of this run.
+        baseline: The results dict of an earlier run.
+        tolerance: How much slower, as a fraction, counts as a regression.
+
+    Returns:
+        A list of (size, measurement, old, new) tuples for regressions.
+    """
+    old_runs = {run["size"]: run for run in baseline["runs"]}
+    regressions = []
+    for run in results["runs"]:
+        old = old_runs.get(run["size"])
+        if old is None:
+            continue
+        pairs = [("load_seconds", old["load_seconds"], run["load_seconds"])]
+        for name, stats in run["commands"].items():
+            if name in old["commands"]:
+                pairs.append((f"{name} p50_ms",
+                              old["commands"][name]["p50_ms"],
+                              stats["p50_ms"]))
+        for measurement, before, after in pairs:
+            if before and after > before * (1 + tolerance):
+                regressions.append((run["size"], measurement, before, after))
+    return regressions
+
+
+def _print_run(run, stream):
+    memory = run["memory_bytes"]
+    print(f"{run['size']} videos: load {run['load_seconds']:.3f}s, "
+          f"index {run['index_seconds']:.3f}s, memory "
+          f"{'-' if memory is None else f'{memory / 2 ** 20:.1f} MiB'}",
+          file=stream)
+    print(f"  {'command':>22} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}", file=stream)
+    for name, stats in run["commands"].items():
+        print(f"  {name:>22} {stats['calls']:>6} {stats['p50_ms']:>9.3f} "
+              f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+              f"{stats['max_ms']:>9.3f}", file=stream)
+    if "mixed" in run:
+        calls = sum(stats["calls"] for stats in run["mixed"].values())
+        print(f"  mixed script: {calls} commands in "
+              f"{run['mixed_seconds']:.3f}s", file=stream)
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks.bench_commands",
+        description="Benchmark every command against catalog size.")
+    argument_parser.add_argument(
+        "sizes", nargs="*", type=int, default=[1000, 10000, 100000])
+    argument_parser.add_argument("--repeat", type=int, default=100)
+    argument_parser.add_argument(
+        "--mode", choices=("eager", "lazy", "snapshot"), default="eager")
+    argument_parser.add_argument("--zipf", type=float, default=0.0)
+    argument_parser.add_argument("--mixed", type=int, default=0,
+                                 metavar="COUNT")
+    argument_parser.add_argument("--cache-entries", type=int, default=0,
+                                 metavar="N")
+    argument_parser.add_argument("--no-memory", action="store_true")
+    argument_parser.add_argument("--output", metavar="FILE")
+    argument_parser.add_argument("--baseline", metavar="FILE")
+    argument_parser.add_argument("--tolerance", type=float, default=0.25)
+    arguments = argument_parser.parse_args(argv)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": arguments.mode,
+        "repeat": arguments.repeat,
+        "zipf": arguments.zipf,
+        "cache_entries": arguments.cache_entries,
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for size in arguments.sizes:
+            run = run_size(directory, size, arguments.repeat, arguments.mode,
+                           not arguments.no_memory, arguments.zipf,
+                           arguments.mixed, arguments.cache_entries)
+            _print_run(run, sys.stderr)
+            results["runs"].append(run)
+
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline:
+            regressions = compare(results, json.load(baseline),
+                                  arguments.tolerance)
+        for size, measurement, before, after in regressions:
+            print(f"REGRESSION {size} videos {measurement}: "
+                  f"{before:.3f} -> {after:.3f}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""CommandParser dispatch cost per command.
+
+Commands are run against a player whose methods do nothing, so only the
+parser's normalisation, lookup and arity check are timed. Run from the
+repository root with:
+
+    python3 -m benchmarks.bench_dispatch [iterations]
+"""
+
+from src.command_parser import CommandParser
+from src.output_sink import CollectorSink
+import sys
+import time
+
+COMMANDS = (
+    ["NUMBER_OF_VIDEOS"], ["SHOW_ALL_VIDEOS"], ["play", "video_id"],
+    ["PLAY_RANDOM"], ["STOP"], ["PAUSE"], ["CONTINUE"], ["SHOW_PLAYING"],
+    ["CREATE_PLAYLIST", "name"], ["ADD_TO_PLAYLIST", "name", "video_id"],
+    ["REMOVE_FROM_PLAYLIST", "name", "video_id"], ["CLEAR_PLAYLIST", "name"],
+    ["DELETE_PLAYLIST", "name"], ["SHOW_PLAYLIST", "name"],
+    ["SHOW_ALL_PLAYLISTS"], ["SEARCH_VIDEOS", "term"],
+    ["SEARCH_VIDEOS_WITH_TAG", "#tag"], ["FLAG_VIDEO", "video_id", "reason"],
+    ["ALLOW_VIDEO", "video_id"], ["UNKNOWN_COMMAND"],
+)
+
+
+class _NullPlayer:
+    sink = CollectorSink()
+
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+def main(iterations):
+    parser = CommandParser(_NullPlayer())
+    parser.register("HELP", lambda: None)
+    print(f"{'command':>24} {'ns/call':>9}")
+    for command in COMMANDS:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            parser.execute_command(command)
+        elapsed = time.perf_counter() - start
+        print(f"{command[0]:>24} {elapsed / iterations * 1e9:>9.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
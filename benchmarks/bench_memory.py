@@ -0,0 +1,59 @@
+"""Memory used by a loaded catalog.
+
+Compares the slotted Video with interned tags against the previous
+representation (a plain class with a __dict__ and a fresh string per tag).
+Run from the repository root with:
+
+    python3 -m benchmarks.bench_memory [size]
+"""
+
+from .synthetic import write_catalog
+from src.video_catalog import load_catalog
+from pathlib import Path
+import csv
+import sys
+import tempfile
+import tracemalloc
+
+
+class _DictVideo:
+    def __init__(self, video_title, video_id, video_tags):
+        self._title = video_title
+        self._video_id = video_id
+        self._tags = tuple(video_tags)
+
+
+def _load_dict_videos(path):
+    videos = {}
+    with open(path) as video_file:
+        for line in csv.reader(video_file, delimiter="|"):
+            title, url, tags = (item.strip() for item in line)
+            videos[url] = _DictVideo(
+                title, url,
+                [tag.strip() for tag in tags.split(",")] if tags else [])
+    return videos
+
+
+def _measure(load, path):
+    tracemalloc.start()
+    videos = load(path)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del videos
+    return size
+
+
+def main(size):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "videos.txt"
+        write_catalog(path, size)
+        before = _measure(_load_dict_videos, path)
+        after = _measure(load_catalog, path)
+    print(f"{size} videos")
+    print(f"  __dict__ videos:          {before / 2 ** 20:8.1f} MiB")
+    print(f"  slotted, interned videos: {after / 2 ** 20:8.1f} MiB")
+    print(f"  saving:                   {1 - after / before:8.1%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,54 @@
+"""Catalog load time against the number of worker processes.
+
+Times load_catalog and load_catalog_parallel with 1, 2, 4, ... workers up
+to the CPU count on one synthetic catalog. Each worker builds the Video
+objects for its chunk, so on a multi-core machine the parallel load time
+should fall as workers are added until the merge in the parent process
+dominates. Run from the repository root with:
+
+    python3 -m benchmarks.bench_parallel_load [size] [repeats]
+"""
+
+from .synthetic import write_catalog
+from src.video_catalog import load_catalog, load_catalog_parallel
+from pathlib import Path
+import os
+import sys
+import tempfile
+import time
+
+
+def _best_time(load, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(size, repeats):
+    cpus = os.cpu_count() or 1
+    worker_counts = []
+    workers = 1
+    while workers < cpus:
+        worker_counts.append(workers)
+        workers *= 2
+    worker_counts.append(cpus)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "videos.txt"
+        write_catalog(path, size)
+        sequential = _best_time(lambda: load_catalog(path), repeats)
+        print(f"{size} videos, {os.path.getsize(path) / 2 ** 20:.1f} MiB, "
+              f"{cpus} CPUs, best of {repeats}")
+        print(f"  load_catalog:           {sequential:7.3f} s")
+        for workers in worker_counts:
+            elapsed = _best_time(
+                lambda: load_catalog_parallel(path, workers, 1), repeats)
+            print(f"  {workers:3} worker processes:   {elapsed:7.3f} s "
+                  f"({sequential / elapsed:4.2f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3)
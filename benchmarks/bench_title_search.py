@@ -0,0 +1,56 @@
+"""Title search latency against catalog size.
+
+Compares the TitleIndex used by SEARCH_VIDEOS with the linear scan it
+replaced. The index is timed with the search result cache off; repeated
+searches answered from the cache are timed separately. Run from the
+repository root with:
+
+    python3 -m benchmarks.bench_title_search [size ...]
+"""
+
+from .synthetic import write_catalog
+from src.video_library import VideoLibrary
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+QUERIES = ("cat", "python tutorial", "Highlights News 12", "zzz", "a")
+
+
+def _linear_search(library, search_term):
+    return [v for v in library.get_legal_videos()
+            if search_term.upper() in v._title.upper()]
+
+
+def _time(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(sizes):
+    print(f"{'videos':>9} {'query':>20} {'matches':>8} "
+          f"{'scan ms':>9} {'index ms':>9} {'cached ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = Path(directory) / f"videos_{size}.txt"
+            write_catalog(path, size)
+            library = VideoLibrary(path, cache_entries=0)
+            cached_library = VideoLibrary(path)
+            repeat = max(1, 100000 // size)
+            for query in QUERIES:
+                matches = len(library.search_titles(query))
+                cached_library.search_titles(query)
+                scan = _time(lambda: _linear_search(library, query), repeat)
+                index = _time(lambda: library.search_titles(query), repeat)
+                cached = _time(lambda: cached_library.search_titles(query),
+                               repeat)
+                print(f"{size:>9} {query:>20} {matches:>8} "
+                      f"{scan * 1000:>9.3f} {index * 1000:>9.3f} "
+                      f"{cached * 1000:>9.3f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,211 @@
+"""Synthetic catalogs and command scripts for benchmarks and load tests.
+
+Catalogs are in the videos.txt format and command scripts are in the
+format read by run.py --batch, so a production sized session can be
+replayed locally with:
+
+    python3 -m src.run --batch SCRIPT --answer No
+
+Scripts hold no answers to search prompts, since whether a search
+prompts depends on its results; give them with --answer. Everything is
+generated from a seed, so the same arguments always give the same files.
+Run from the repository root with:
+
+    python3 -m benchmarks.synthetic catalog FILE SIZE [--seed N]
+        [--tags N] [--zipf S] [--title-words MIN MAX]
+    python3 -m benchmarks.synthetic commands FILE COUNT --videos SIZE
+        [--seed N] [--tags N] [--zipf S] [--mix NAME=WEIGHT ...]
+"""
+
+import argparse
+import itertools
+import random
+
+WORDS = ("amazing", "funny", "cat", "dog", "google", "life", "video",
+         "about", "nothing", "music", "live", "tutorial", "python", "cooking",
+         "travel", "review", "game", "highlights", "news", "science")
+
+# Relative weights of the commands in a generated script.
+DEFAULT_MIX = {
+    "PLAY": 25, "PLAY_RANDOM": 5, "STOP": 5, "PAUSE": 3, "CONTINUE": 3,
+    "SHOW_PLAYING": 5, "SEARCH_VIDEOS": 20, "SEARCH_VIDEOS_WITH_TAG": 10,
+    "FLAG_VIDEO": 2, "ALLOW_VIDEO": 1, "CREATE_PLAYLIST": 2,
+    "ADD_TO_PLAYLIST": 10, "REMOVE_FROM_PLAYLIST": 3, "SHOW_PLAYLIST": 3,
+    "SHOW_ALL_PLAYLISTS": 1, "CLEAR_PLAYLIST": 1, "DELETE_PLAYLIST": 1,
+}
+
+
+def zipf_weights(count, exponent):
+    """Returns cumulative Zipf weights for ranks 1 to count.
+
+    Args:
+        count: The number of ranks.
+        exponent: The Zipf exponent; 0 makes every rank equally likely.
+    """
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class ZipfPicker:
+    """Picks ranks 0 to count-1, with Zipfian popularity if exponent > 0."""
+
+    def __init__(self, rng, count, exponent):
+        self._rng = rng
+        self._count = count
+        self._cumulative = zipf_weights(count, exponent) if exponent else None
+        self._ranks = range(count)
+
+    def __call__(self):
+        if self._cumulative is None:
+            return self._rng.randrange(self._count)
+        return self._rng.choices(self._ranks,
+                                 cum_weights=self._cumulative)[0]
+
+
+def write_catalog(path, size, seed=0, tags=1000, zipf=0.0,
+                  title_words=(2, 6), tags_per_video=(0, 4)):
+    """Writes a random videos.txt formatted catalog.
+
+    Video number n has the id video_n and its number at the end of its
+    title, so generated commands can refer to it.
+
+    Args:
+        path: Where to write the catalog.
+        size: The number of videos.
+        seed: The random seed, so catalogs are reproducible.
+        tags: The size of the tag vocabulary, #tag0 to #tag<tags-1>.
+        zipf: The Zipf exponent of tag popularity, so #tag0 is the most
+            used tag; 0 picks tags uniformly.
+        title_words: The least and most words in a title.
+        tags_per_video: The least and most tags on a video.
+    """
+    rng = random.Random(seed)
+    pick_tag = ZipfPicker(rng, tags, zipf)
+    with open(path, "w") as catalog:
+        for number in range(size):
+            title = " ".join(rng.choice(WORDS)
+                             for _ in range(rng.randint(*title_words)))
+            video_tags = " , ".join(f"#tag{pick_tag()}"
+                                    for _ in range(rng.randint(
+                                        *tags_per_video)))
+            catalog.write(f"{title.title()} {number} | video_{number} | "
+                          f"{video_tags}\n")
+
+
+def generate_commands(count, videos, seed=0, tags=1000, zipf=0.0, mix=None):
+    """Generates a script of commands for a catalog from write_catalog.
+
+    Videos and tags are picked with the same Zipfian popularity as the
+    catalog's tags. ALLOW_VIDEO is given a flagged video and playlist
+    commands a created playlist whenever there is one, so most commands
+    do real work rather than fail.
+
+    Args:
+        count: The number of commands.
+        videos: The size of the catalog.
+        seed: The random seed, so scripts are reproducible.
+        tags: The size of the catalog's tag vocabulary.
+        zipf: The Zipf exponent of video and tag popularity.
+        mix: A dict of command name to relative weight, DEFAULT_MIX if None.
+
+    Returns:
+        A list of command lines, without line breaks.
+    """
+    rng = random.Random(seed)
+    mix = DEFAULT_MIX if mix is None else mix
+    names = list(mix)
+    cumulative = list(itertools.accumulate(mix[name] for name in names))
+    pick_video = ZipfPicker(rng, videos, zipf)
+    pick_tag = ZipfPicker(rng, tags, zipf)
+    flagged = []
+    playlists = []
+
+    def video_id():
+        return f"video_{pick_video()}"
+
+    def playlist():
+        return rng.choice(playlists) if playlists else "my_playlist"
+
+    lines = []
+    for name in rng.choices(names, cum_weights=cumulative, k=count):
+        if name in ("PLAY", "ADD_TO_PLAYLIST", "REMOVE_FROM_PLAYLIST"):
+            arguments = [video_id()]
+            if name != "PLAY":
+                arguments.insert(0, playlist())
+        elif name == "SEARCH_VIDEOS":
+            arguments = [rng.choice(WORDS)]
+        elif name == "SEARCH_VIDEOS_WITH_TAG":
+            arguments = [f"#tag{pick_tag()}"]
+        elif name == "FLAG_VIDEO":
+            flagged.append(video_id())
+            arguments = [flagged[-1], "load_test"]
+        elif name == "ALLOW_VIDEO":
+            arguments = [flagged.pop(rng.randrange(len(flagged)))
+                         if flagged else video_id()]
+        elif name == "CREATE_PLAYLIST":
+            playlists.append(f"playlist_{len(playlists)}")
+            arguments = [playlists[-1]]
+        elif name in ("SHOW_PLAYLIST", "CLEAR_PLAYLIST"):
+            arguments = [playlist()]
+        elif name == "DELETE_PLAYLIST":
+            arguments = [playlists.pop(rng.randrange(len(playlists)))
+                         if playlists else "my_playlist"]
+        else:
+            arguments = []
+        lines.append(" ".join([name] + arguments))
+    return lines
+
+
+def write_commands(path, count, videos, **options):
+    """Writes generate_commands(count, videos, **options) to path."""
+    with open(path, "w") as script:
+        script.writelines(line + "\n"
+                          for line in generate_commands(count, videos,
+                                                        **options))
+
+
+def _parse_mix(items):
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        mix[name.upper()] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks.synthetic",
+        description="Generate synthetic catalogs and command scripts.")
+    commands = argument_parser.add_subparsers(dest="kind", required=True)
+    catalog = commands.add_parser("catalog", help="write a videos.txt")
+    catalog.add_argument("path")
+    catalog.add_argument("size", type=int)
+    catalog.add_argument("--title-words", nargs=2, type=int, default=(2, 6),
+                         metavar=("MIN", "MAX"))
+    script = commands.add_parser("commands", help="write a command script")
+    script.add_argument("path")
+    script.add_argument("count", type=int)
+    script.add_argument("--videos", type=int, required=True,
+                        help="the size of the catalog")
+    script.add_argument("--mix", nargs="+", default=[],
+                        metavar="NAME=WEIGHT",
+                        help="command weights, replacing the default mix")
+    for subparser in (catalog, script):
+        subparser.add_argument("--seed", type=int, default=0)
+        subparser.add_argument("--tags", type=int, default=1000)
+        subparser.add_argument("--zipf", type=float, default=0.0)
+    arguments = argument_parser.parse_args(argv)
+
+    if arguments.kind == "catalog":
+        write_catalog(arguments.path, arguments.size, arguments.seed,
+                      arguments.tags, arguments.zipf,
+                      tuple(arguments.title_words))
+    else:
+        write_commands(arguments.path, arguments.count, arguments.videos,
+                       seed=arguments.seed, tags=arguments.tags,
+                       zipf=arguments.zipf,
+                       mix=_parse_mix(arguments.mix) or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""A binary video catalog snapshot format.
+
+A snapshot is a compiled form of videos.txt that can be memory mapped and
+used straight away, without parsing any text. The layout (little endian) is:
+
+    header        magic, format version, source size, source mtime,
+                  source sha256 and the three table lengths below
+    string index  (strings + 1) uint64 offsets into the string blob
+    records       one fixed-width (title, video_id, first tag, tag count)
+                  uint32 record per video, sorted by video_id
+    tag table     uint32 string numbers referenced by the records
+    string blob   every distinct title, video_id and tag, utf-8 encoded
+
+Strings are stored once, so tags shared by many videos cost four bytes
+per use. Lookups binary search the records by video_id.
+"""
+
+from .video import Video
+from .video_catalog import OverlayCatalog, load_catalog
+from pathlib import Path
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+MAGIC = b"YTVS"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHHQQ32sQQQ")
+_MTIME = struct.Struct("<Q")
+_MTIME_OFFSET = struct.calcsize("<4sHHQ")
+_RECORD_FIELDS = 4
+
+
+class SnapshotException(Exception):
+    """A class used to represent an unreadable snapshot file."""
+    pass
+
+
+def default_snapshot_path(source):
+    """Returns the snapshot path used for a videos.txt file."""
+    source = Path(source)
+    return source.with_name(source.name + ".snapshot")
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source_file:
+        for block in iter(lambda: source_file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def compile_snapshot(source, snapshot=None):
+    """Compiles a videos.txt file into a binary snapshot.
+
+    The snapshot is written to a uniquely named temporary file next to it
+    and moved into place, so readers never see a partially written
+    snapshot and concurrent compiles do not write to the same file.
+
+    Args:
+        source: The videos.txt file to compile.
+        snapshot: Where to write the snapshot, defaults to
+            default_snapshot_path(source).
+
+    Returns:
+        The path of the written snapshot.
+    """
+    source = Path(source)
+    snapshot = Path(snapshot) if snapshot else default_snapshot_path(source)
+    stat = source.stat()
+    digest = _file_digest(source)
+    videos = load_catalog(source)
+
+    string_numbers = {}
+    strings = []
+
+    def intern(text):
+        number = string_numbers.get(text)
+        if number is None:
+            number = string_numbers[text] = len(strings)
+            strings.append(text.encode())
+        return number
+
+    records = []
+    tag_refs = []
+    for video_id in sorted(videos, key=str.encode):
+        video = videos[video_id]
+        records.extend((intern(video.title), intern(video_id),
+                        len(tag_refs), len(video.tags)))
+        tag_refs.extend(intern(tag) for tag in video.tags)
+
+    offsets = [0]
+    for encoded in strings:
+        offsets.append(offsets[-1] + len(encoded))
+
+    descriptor, temporary = tempfile.mkstemp(
+        dir=snapshot.parent, prefix=snapshot.name + ".", suffix=".tmp")
+    try:
+        with open(descriptor, "wb") as snapshot_file:
+            snapshot_file.write(_HEADER.pack(
+                MAGIC, VERSION, 0, stat.st_size, stat.st_mtime_ns, digest,
+                len(strings), len(videos), len(tag_refs)))
+            snapshot_file.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+            snapshot_file.write(struct.pack(f"<{len(records)}I", *records))
+            snapshot_file.write(
+                struct.pack(f"<{len(tag_refs)}I", *tag_refs))
+            snapshot_file.write(b"".join(strings))
+        os.replace(temporary, snapshot)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return snapshot
+
+
+def _read_header(snapshot):
+    try:
+        with open(snapshot, "rb") as snapshot_file:
+            header = snapshot_file.read(_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) != _HEADER.size:
+        return None
+    fields = _HEADER.unpack(header)
+    if fields[0] != MAGIC or fields[1] != VERSION:
+        return None
+    return fields
+
+
+def is_snapshot_current(source, snapshot=None):
+    """Checks whether a snapshot still describes its source file.
+
+    The source size and mtime are compared first; the source is only hashed
+    when the mtime differs, so an untouched file is checked without reading
+    it. When the hash still matches, the new mtime is written into the
+    snapshot header, so a merely touched file is hashed only once.
+
+    Args:
+        source: The videos.txt file the snapshot was compiled from.
+        snapshot: The snapshot path, defaults to
+            default_snapshot_path(source).
+
+    Returns:
+        True if the snapshot can be used as-is.
+    """
+    snapshot = snapshot or default_snapshot_path(source)
+    header = _read_header(snapshot)
+    if header is None:
+        return False
+    _, _, _, size, mtime_ns, digest, _, _, _ = header
+    stat = Path(source).stat()
+    if stat.st_size != size:
+        return False
+    if stat.st_mtime_ns == mtime_ns:
+        return True
+    if _file_digest(source) != digest:
+        return False
+    try:
+        with open(snapshot, "r+b") as snapshot_file:
+            snapshot_file.seek(_MTIME_OFFSET)
+            snapshot_file.write(_MTIME.pack(stat.st_mtime_ns))
+    except OSError:
+        pass  # A read-only snapshot is still current, just rehashed.
+    return True
+
+
+class SnapshotCatalog(OverlayCatalog):
+    """A mapping of video_id to Video backed by a snapshot."""
+
+    def __init__(self, snapshot):
+        """The snapshot is memory mapped and its tables are located.
+
+        Args:
+            snapshot: The path of a compiled snapshot.
+        """
+        self._file = open(snapshot, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        if len(self._data) < _HEADER.size:
+            self.close()
+            raise SnapshotException(f"Truncated snapshot: {snapshot}")
+        (magic, version, _, _, _, _,
+         n_strings, n_records, n_tag_refs) = _HEADER.unpack_from(self._data)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise SnapshotException(f"Unsupported snapshot: {snapshot}")
+        if sys.byteorder != "little":
+            self.close()
+            raise SnapshotException("Snapshots require a little endian host")
+        view = self._view = memoryview(self._data)
+        start = _HEADER.size
+        end = start + 8 * (n_strings + 1)
+        self._offsets = view[start:end].cast("Q")
+        start, end = end, end + 4 * _RECORD_FIELDS * n_records
+        self._records = view[start:end].cast("I")
+        start, end = end, end + 4 * n_tag_refs
+        self._tag_refs = view[start:end].cast("I")
+        self._blob = end
+        self._length = n_records
+        self._tags = {}
+        super().__init__()
+
+    def _bytes(self, number):
+        start = self._blob + self._offsets[number]
+        end = self._blob + self._offsets[number + 1]
+        return self._data[start:end]
+
+    def _string(self, number):
+        return self._bytes(number).decode()
+
+    def _find(self, video_id):
+        """Returns the record number of video_id, or -1."""
+        key = video_id.encode()
+        records = self._records
+        low, high = 0, self._length
+        while low < high:
+            middle = (low + high) // 2
+            found = self._bytes(records[middle * _RECORD_FIELDS + 1])
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def _materialise(self, video_id):
+        record = self._find(video_id)
+        if record < 0:
+            raise KeyError(video_id)
+        base = record * _RECORD_FIELDS
+        title, video_id, first_tag, tag_count = \
+            self._records[base:base + _RECORD_FIELDS]
+        tags = tuple(self._tag(number) for number in
+                     self._tag_refs[first_tag:first_tag + tag_count])
+        return Video(self._string(title), self._string(video_id), tags)
+
+    def _tag(self, number):
+        """Returns a tag string, shared by every video using the tag."""
+        tag = self._tags.get(number)
+        if tag is None:
+            tag = self._tags[number] = self._string(number)
+        return tag
+
+    def _has(self, video_id):
+        return video_id in self._cache or self._find(video_id) >= 0
+
+    def _ids(self):
+        records = self._records
+        for record in range(self._length):
+            yield self._string(records[record * _RECORD_FIELDS + 1])
+
+    def _count(self):
+        return self._length
+
+    def close(self):
+        """Releases the memory map and the underlying file."""
+        for attribute in ("_offsets", "_records", "_tag_refs", "_view"):
+            view = getattr(self, attribute, None)
+            if view is not None:
+                view.release()
+        self._data.close()
+        self._file.close()
+
+
+def open_snapshot(source, snapshot=None):
+    """Opens the snapshot of a videos.txt file, compiling it if needed.
+
+    Args:
+        source: The videos.txt file.
+        snapshot: The snapshot path, defaults to
+            default_snapshot_path(source).
+
+    Returns:
+        A SnapshotCatalog for the current contents of source.
+    """
+    snapshot = snapshot or default_snapshot_path(source)
+    if not is_snapshot_current(source, snapshot):
+        compile_snapshot(source, snapshot)
+    return SnapshotCatalog(snapshot)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m src.catalog_snapshot <videos.txt> "
+              "[<snapshot>]")
+        sys.exit(1)
+    print(f"Wrote {compile_snapshot(*sys.argv[1:])}")
@@ -0,0 +1,74 @@
+"""A catalog file watcher class."""
+
+import threading
+
+
+class CatalogWatcher:
+    """A class used to reload a VideoLibrary when its file changes.
+
+    A daemon thread polls the catalog file's mtime and size and calls
+    VideoLibrary.reload once they have changed and then stayed the same
+    for a whole poll, so a file that is still being written is not loaded
+    part way through.
+    """
+
+    def __init__(self, video_library, interval=1.0, on_reload=None):
+        """The CatalogWatcher class is initialized.
+
+        Args:
+            video_library: The VideoLibrary to keep up to date.
+            interval: Seconds between polls.
+            on_reload: Optional callback given each CatalogChanges.
+        """
+        self._video_library = video_library
+        self._interval = interval
+        self._on_reload = on_reload
+        self._stopped = threading.Event()
+        self._thread = None
+        # The changed file state seen by the previous poll, if any.
+        self._changed_state = None
+
+    def check(self):
+        """Polls the file once, reloading it if it changed and settled.
+
+        A change is only reloaded when the previous poll saw the same
+        mtime and size.
+
+        Returns:
+            The CatalogChanges applied, or None if nothing was reloaded.
+        """
+        library = self._video_library
+        if not library.has_source_changed():
+            self._changed_state = None
+            return None
+        state = library.get_source_state()
+        if state != self._changed_state:
+            self._changed_state = state
+            return None
+        self._changed_state = None
+        changes = library.reload()
+        if self._on_reload is not None:
+            self._on_reload(changes)
+        return changes
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            try:
+                self.check()
+            except (OSError, ValueError):
+                # The file may still be malformed; try again next poll.
+                continue
+
+    def start(self):
+        """Starts polling in a background thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops polling and waits for the thread to finish."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
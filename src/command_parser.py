@@ -1,7 +1,8 @@
 """A command parser class."""
 
-import textwrap
-from typing import Sequence
+from .command_stats import UNKNOWN_COMMAND
+from typing import Callable, Optional, Sequence, Tuple
+import time
 
 
 class CommandException(Exception):
@@ -9,155 +10,186 @@ class CommandException(Exception):
     pass
 
 
+class Command:
+    """A class used to represent a registered command."""
+
+    __slots__ = ("name", "handler", "arities", "usage", "help")
+
+    def __init__(self, name: str, handler: Callable,
+                 arities: Optional[Tuple[int, ...]], usage: str, help: str):
+        """Command constructor.
+
+        Args:
+            name: The upper case command name.
+            handler: Called with the command's arguments.
+            arities: The allowed numbers of arguments. If None, arguments
+                are ignored and the handler is called without any.
+            usage: The CommandException message for a wrong arity.
+            help: The HELP line describing the command.
+        """
+        self.name = name
+        self.handler = handler
+        self.arities = arities
+        self.usage = usage
+        self.help = help
+
+
+# The built-in commands: name, VideoPlayer method, arities, usage message
+# and help line, in HELP order.
+_PLAYER_COMMANDS = (
+    ("NUMBER_OF_VIDEOS", "number_of_videos", None, "",
+     "NUMBER_OF_VIDEOS - Shows how many videos are in the library."),
+    ("SHOW_ALL_VIDEOS", "show_all_videos", None, "",
+     "SHOW_ALL_VIDEOS - Lists all videos from the library."),
+    ("PLAY", "play_video", (1,),
+     "Please enter PLAY command followed by video_id.",
+     "PLAY <video_id> - Plays specified video."),
+    ("PLAY_RANDOM", "play_random_video", None, "",
+     "PLAY_RANDOM - Plays a random video from the library."),
+    ("STOP", "stop_video", None, "",
+     "STOP - Stop the current video."),
+    ("PAUSE", "pause_video", None, "",
+     "PAUSE - Pause the current video."),
+    ("CONTINUE", "continue_video", None, "",
+     "CONTINUE - Resume the current paused video."),
+    ("SHOW_PLAYING", "show_playing", None, "",
+     "SHOW_PLAYING - Displays the title, url and paused status of the "
+     "video that is currently playing (or paused)."),
+    ("CREATE_PLAYLIST", "create_playlist", (1,),
+     "Please enter CREATE_PLAYLIST command followed by a playlist name.",
+     "CREATE_PLAYLIST <playlist_name> - Creates a new (empty) playlist "
+     "with the provided name."),
+    ("ADD_TO_PLAYLIST", "add_to_playlist", (2,),
+     "Please enter ADD_TO_PLAYLIST command followed by a playlist name "
+     "and video_id to add.",
+     "ADD_TO_PLAYLIST <playlist_name> <video_id> - Adds the requested "
+     "video to the playlist."),
+    ("REMOVE_FROM_PLAYLIST", "remove_from_playlist", (2,),
+     "Please enter REMOVE_FROM_PLAYLIST command followed by a playlist "
+     "name and video_id to remove.",
+     "REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the "
+     "specified video from the specified playlist"),
+    ("CLEAR_PLAYLIST", "clear_playlist", (1,),
+     "Please enter CLEAR_PLAYLIST command followed by a playlist name.",
+     "CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the "
+     "playlist."),
+    ("DELETE_PLAYLIST", "delete_playlist", (1,),
+     "Please enter DELETE_PLAYLIST command followed by a playlist name.",
+     "DELETE_PLAYLIST <playlist_name> - Deletes the playlist."),
+    ("SHOW_PLAYLIST", "show_playlist", (1,),
+     "Please enter SHOW_PLAYLIST command followed by a playlist name.",
+     "SHOW_PLAYLIST <playlist_name> - List all the videos in this "
+     "playlist."),
+    ("SHOW_ALL_PLAYLISTS", "show_all_playlists", None, "",
+     "SHOW_ALL_PLAYLISTS - Display all the available playlists."),
+    ("SEARCH_VIDEOS", "search_videos", (1, 3, 5),
+     "Please enter SEARCH_VIDEOS command followed by a search term.",
+     "SEARCH_VIDEOS <search_term> [LIMIT n] [PAGE k] - Display all the "
+     "videos whose titles contain the search_term, or the k-th page of n."),
+    ("SEARCH_VIDEOS_WITH_TAG", "search_videos_tag", (1, 3, 5),
+     "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a video tag.",
+     "SEARCH_VIDEOS_WITH_TAG <tag_name> [LIMIT n] [PAGE k] -Display all "
+     "videos whose tags contains the provided tag, or the k-th page of n."),
+    ("FLAG_VIDEO", "flag_video", (1, 2),
+     "Please enter FLAG_VIDEO command followed by a video_id and an "
+     "optional flag reason.",
+     "FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged."),
+    ("ALLOW_VIDEO", "allow_video", (1,),
+     "Please enter ALLOW_VIDEO command followed by a video_id.",
+     "ALLOW_VIDEO <video_id> - Removes a flag from a video."),
+)
+
+
 class CommandParser:
     """A class used to parse and execute a user Command."""
 
-    def __init__(self, video_player):
+    def __init__(self, video_player, sink=None, stats=None):
+        """The CommandParser class is initialized.
+
+        Args:
+            video_player: The VideoPlayer that commands are run on.
+            sink: The OutputSink for the parser's own output, defaults to
+                the player's sink.
+            stats: Optional CommandStats that every command's time and
+                outcome are recorded in, and that the STATS command shows.
+                Commands are not timed at all without it.
+        """
         self._player = video_player
+        self._sink = sink or video_player.sink
+        self.stats = stats
+        self._run = self._dispatch if stats is None else self._timed_dispatch
+        self._commands = {}
+        for name, method, arities, usage, help in _PLAYER_COMMANDS:
+            self.register(name, getattr(video_player, method), arities,
+                          usage, help)
+        if stats is not None:
+            self.register("STATS", self._show_stats, None, "",
+                          "STATS - Shows how often each command ran, how "
+                          "often it failed and how long it took.")
+        self.register("HELP", self._get_help, None, "",
+                      "HELP - Displays help.")
+
+    def register(self, name, handler, arities=None, usage="", help=""):
+        """Registers a command, replacing any command with the same name.
+
+        Args:
+            name: The command name, matched ignoring case.
+            handler: Called with the command's arguments.
+            arities: The allowed numbers of arguments. If None, arguments
+                are ignored and the handler is called without any.
+            usage: The CommandException message for a wrong arity.
+            help: The HELP line describing the command.
+        """
+        name = name.upper()
+        self._commands[name] = Command(name, handler, arities, usage, help)
 
     def execute_command(self, command: Sequence[str]):
         """Executes the user command. Expects the command to be upper case.
            Raises CommandException if a command cannot be parsed.
         """
+        self._sink.begin(command)
+        try:
+            self._run(command)
+        finally:
+            self._sink.end()
+
+    def _timed_dispatch(self, command: Sequence[str]):
+        name = command[0].upper() if command else ""
+        if name not in self._commands:
+            name = UNKNOWN_COMMAND
+        error = True
+        start = time.perf_counter()
+        try:
+            self._dispatch(command)
+            error = name == UNKNOWN_COMMAND
+        finally:
+            self.stats.record(name, time.perf_counter() - start, error)
+
+    def _dispatch(self, command: Sequence[str]):
         if not command:
             raise CommandException(
                 "Please enter a valid command, "
                 "type HELP for a list of available commands.")
-
-        if command[0].upper() == "NUMBER_OF_VIDEOS":
-            self._player.number_of_videos()
-
-        elif command[0].upper() == "SHOW_ALL_VIDEOS":
-            self._player.show_all_videos()
-
-        elif command[0].upper() == "PLAY":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter PLAY command followed by video_id.")
-            self._player.play_video(command[1])
-
-        elif command[0].upper() == "PLAY_RANDOM":
-            self._player.play_random_video()
-
-        elif command[0].upper() == "STOP":
-            self._player.stop_video()
-
-        elif command[0].upper() == "PAUSE":
-            self._player.pause_video()
-
-        elif command[0].upper() == "CONTINUE":
-            self._player.continue_video()
-
-        elif command[0].upper() == "SHOW_PLAYING":
-            self._player.show_playing()
-
-        elif command[0].upper() == "CREATE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CREATE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.create_playlist(command[1])
-
-        elif command[0].upper() == "ADD_TO_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter ADD_TO_PLAYLIST command followed by a "
-                    "playlist name and video_id to add.")
-            self._player.add_to_playlist(command[1], command[2])
-
-        elif command[0].upper() == "REMOVE_FROM_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter REMOVE_FROM_PLAYLIST command followed by a "
-                    "playlist name and video_id to remove.")
-            self._player.remove_from_playlist(command[1], command[2])
-
-        elif command[0].upper() == "CLEAR_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CLEAR_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.clear_playlist(command[1])
-
-        elif command[0].upper() == "DELETE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter DELETE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.delete_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SHOW_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.show_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_ALL_PLAYLISTS":
-            self._player.show_all_playlists()
-
-        elif command[0].upper() == "SEARCH_VIDEOS":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS command followed by a "
-                    "search term.")
-            self._player.search_videos(command[1])
-
-        elif command[0].upper() == "SEARCH_VIDEOS_WITH_TAG":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a "
-                    "video tag.")
-            self._player.search_videos_tag(command[1])
-
-        elif command[0].upper() == "FLAG_VIDEO":
-            if len(command) == 3:
-                self._player.flag_video(command[1], command[2])
-            elif len(command) == 2:
-                self._player.flag_video(command[1])
-            else:
-                raise CommandException(
-                    "Please enter FLAG_VIDEO command followed by a "
-                    "video_id and an optional flag reason.")
-
-        elif command[0].upper() == "ALLOW_VIDEO":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter ALLOW_VIDEO command followed by a "
-                    "video_id.")
-            self._player.allow_video(command[1])
-
-        elif command[0].upper() == "HELP":
-            self._get_help()
-        else:
-            print(
+        entry = self._commands.get(command[0].upper())
+        if entry is None:
+            self._sink.write(
                 "Please enter a valid command, type HELP for a list of "
                 "available commands.")
+        elif entry.arities is None:
+            entry.handler()
+        elif len(command) - 1 in entry.arities:
+            entry.handler(*command[1:])
+        else:
+            raise CommandException(entry.usage)
+
+    def _show_stats(self):
+        """Displays the statistics of every command run so far."""
+        self._sink.write_lines(self.stats.format_lines())
 
     def _get_help(self):
         """Displays all available commands to the user."""
-        help_text = textwrap.dedent("""
-        Available commands:
-            NUMBER_OF_VIDEOS - Shows how many videos are in the library.
-            SHOW_ALL_VIDEOS - Lists all videos from the library.
-            PLAY <video_id> - Plays specified video.
-            PLAY_RANDOM - Plays a random video from the library.
-            STOP - Stop the current video.
-            PAUSE - Pause the current video.
-            CONTINUE - Resume the current paused video.
-            SHOW_PLAYING - Displays the title, url and paused status of the video that is currently playing (or paused).
-            CREATE_PLAYLIST <playlist_name> - Creates a new (empty) playlist with the provided name.
-            ADD_TO_PLAYLIST <playlist_name> <video_id> - Adds the requested video to the playlist.
-            REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the specified video from the specified playlist
-            CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the playlist.
-            DELETE_PLAYLIST <playlist_name> - Deletes the playlist.
-            SHOW_PLAYLIST <playlist_name> - List all the videos in this playlist.
-            SHOW_ALL_PLAYLISTS - Display all the available playlists.
-            SEARCH_VIDEOS <search_term> - Display all the videos whose titles contain the search_term.
-            SEARCH_VIDEOS_WITH_TAG <tag_name> -Display all videos whose tags contains the provided tag.
-            FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged.
-            ALLOW_VIDEO <video_id> - Removes a flag from a video.
-            HELP - Displays help.
-            EXIT - Terminates the program execution.
-        """)
-        print(help_text)
+        lines = [entry.help for entry in self._commands.values()
+                 if entry.help]
+        lines.append("EXIT - Terminates the program execution.")
+        self._sink.write_lines(["", "Available commands:",
+                                *(f"    {line}" for line in lines), ""])
@@ -0,0 +1,117 @@
+"""A per-command statistics class."""
+
+import bisect
+import math
+import threading
+
+# Latency histogram bucket upper bounds in seconds: four buckets per
+# doubling from 1 microsecond to about 2 minutes, so a percentile read
+# from the histogram is within 19% of the true value.
+_BUCKET_BOUNDS = tuple(1e-6 * 2 ** (i / 4) for i in range(4 * 27 + 1))
+
+UNKNOWN_COMMAND = "UNKNOWN"
+
+
+class _Entry:
+    __slots__ = ("calls", "errors", "total", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(_BUCKET_BOUNDS) + 1)
+
+
+class CommandStats:
+    """A class used to count and time the commands a CommandParser runs.
+
+    Each command name keeps its call count, error count, total time and a
+    fixed size latency histogram, so recording is O(1) memory per command
+    however many calls are made. Percentiles are read from the histogram
+    and are the upper bound of the bucket they fall in.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, error=False):
+        """Records one call of a command.
+
+        Args:
+            name: The command name.
+            seconds: How long the command took.
+            error: Whether the command failed.
+        """
+        bucket = bisect.bisect_left(_BUCKET_BOUNDS, seconds)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = _Entry()
+            entry.calls += 1
+            entry.total += seconds
+            entry.buckets[bucket] += 1
+            if error:
+                entry.errors += 1
+
+    def get_command_stats(self, name):
+        """Returns a dict of one command's statistics.
+
+        Args:
+            name: The command name.
+
+        Returns:
+            A dict with calls, errors, total, mean, p50, p95 and p99, times
+            in seconds, or None if the command has not been run.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            calls, errors, total = entry.calls, entry.errors, entry.total
+            buckets = list(entry.buckets)
+        return {
+            "calls": calls,
+            "errors": errors,
+            "total": total,
+            "mean": total / calls,
+            "p50": _percentile(buckets, calls, 0.50),
+            "p95": _percentile(buckets, calls, 0.95),
+            "p99": _percentile(buckets, calls, 0.99),
+        }
+
+    def get_all_stats(self):
+        """Returns a dict of command name to get_command_stats, by name."""
+        with self._lock:
+            names = sorted(self._entries)
+        return {name: self.get_command_stats(name) for name in names}
+
+    def format_lines(self):
+        """Returns the statistics as lines of text, as STATS shows them."""
+        all_stats = self.get_all_stats()
+        if not all_stats:
+            return ["No commands have been run yet"]
+        lines = ["Command statistics (latencies in ms):"]
+        for name, stats in all_stats.items():
+            lines.append(
+                f"  {name}: {stats['calls']} calls, {stats['errors']} errors, "
+                f"p50 {stats['p50'] * 1e3:.3f}, p95 {stats['p95'] * 1e3:.3f}, "
+                f"p99 {stats['p99'] * 1e3:.3f}")
+        return lines
+
+    def reset(self):
+        """Forgets every recorded call."""
+        with self._lock:
+            self._entries = {}
+
+
+def _percentile(buckets, calls, fraction):
+    rank = max(1, math.ceil(fraction * calls))
+    seen = 0
+    for index, count in enumerate(buckets):
+        seen += count
+        if seen >= rank:
+            if index == len(_BUCKET_BOUNDS):
+                return float("inf")
+            return _BUCKET_BOUNDS[index]
+    return float("inf")
@@ -0,0 +1,216 @@
+"""A durable video flag store class."""
+
+import os
+import struct
+import threading
+import zlib
+
+# Record: operation, video_id length, reason length, then the utf-8 video_id
+# and reason, then a crc32 of everything before it.
+_RECORD = struct.Struct("<cII")
+_CRC = struct.Struct("<I")
+_FLAG = b"F"
+_ALLOW = b"A"
+
+
+def _encode(operation, video_id, reason=""):
+    video_id = video_id.encode()
+    reason = reason.encode()
+    record = _RECORD.pack(operation, len(video_id), len(reason)) + \
+        video_id + reason
+    return record + _CRC.pack(zlib.crc32(record))
+
+
+def _decode(data):
+    """Yields (operation, video_id, reason, end offset) for each record.
+
+    Decoding stops at the first truncated or corrupt record.
+    """
+    position = 0
+    while position + _RECORD.size <= len(data):
+        operation, id_length, reason_length = \
+            _RECORD.unpack_from(data, position)
+        end = position + _RECORD.size + id_length + reason_length
+        if end + _CRC.size > len(data) or operation not in (_FLAG, _ALLOW):
+            return
+        (crc,) = _CRC.unpack_from(data, end)
+        if crc != zlib.crc32(data[position:end]):
+            return
+        start = position + _RECORD.size
+        video_id = data[start:start + id_length].decode()
+        reason = data[start + id_length:end].decode()
+        position = end + _CRC.size
+        yield operation, video_id, reason, position
+
+
+class FlagStore:
+    """A class used to persist FLAG_VIDEO and ALLOW_VIDEO decisions.
+
+    Every decision is appended to a log file. flag and allow only update
+    the live flags and buffer the record in memory, so they are cheap to
+    call under the library's lock. A background writer thread commits the
+    buffered records with one write and fsync per group (group commit):
+    as soon as sync_every records are buffered, otherwise every
+    sync_interval seconds, and on sync() or close(). A crash loses at most
+    the uncommitted group. When the log grows well past the number of live
+    flags the writer also compacts it: after the commit, the live flags
+    are written to a snapshot file, which is moved into place atomically,
+    and the log is truncated.
+    """
+
+    def __init__(self, path, sync_every=64, sync_interval=1.0,
+                 compact_ratio=4, compact_min=1024):
+        """The FlagStore class is initialized.
+
+        Args:
+            path: The log file; the snapshot is kept next to it with a
+                .snapshot suffix.
+            sync_every: Buffered records that wake the writer early.
+            sync_interval: Seconds between the writer's commits.
+            compact_ratio: Compact once the log holds this many records
+                per live flag...
+            compact_min: ...and at least this many records.
+        """
+        self._path = str(path)
+        self._snapshot_path = self._path + ".snapshot"
+        self._sync_every = sync_every
+        self._sync_interval = sync_interval
+        self._compact_ratio = compact_ratio
+        self._compact_min = compact_min
+        self._flags = {}
+        self._pending = []
+        self._log_records = 0
+        self._closed = False
+        # _lock guards the live flags and the buffer; _io_lock serialises
+        # commits and compactions, which run without holding _lock.
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._recover()
+        self._log = open(self._path, "ab")
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _recover(self):
+        for path, is_log in ((self._snapshot_path, False), (self._path, True)):
+            try:
+                with open(path, "rb") as store_file:
+                    data = store_file.read()
+            except FileNotFoundError:
+                continue
+            end = 0
+            for operation, video_id, reason, end in _decode(data):
+                if operation == _FLAG:
+                    self._flags[video_id] = reason
+                else:
+                    self._flags.pop(video_id, None)
+                if is_log:
+                    self._log_records += 1
+            if is_log and end < len(data):
+                # Drop a torn tail left by a crash mid-append.
+                with open(path, "r+b") as store_file:
+                    store_file.truncate(end)
+
+    def load(self):
+        """Returns a dict of every flagged video_id to its flag reason."""
+        with self._lock:
+            return dict(self._flags)
+
+    def flag(self, video_id, flag_reason):
+        """Records that a video was flagged.
+
+        Args:
+            video_id: The flagged video_id.
+            flag_reason: Reason for flagging the video.
+        """
+        with self._lock:
+            self._flags[video_id] = flag_reason
+            self._append(_encode(_FLAG, video_id, flag_reason))
+
+    def allow(self, video_id):
+        """Records that a flag was removed from a video.
+
+        Args:
+            video_id: The allowed video_id.
+        """
+        with self._lock:
+            self._flags.pop(video_id, None)
+            self._append(_encode(_ALLOW, video_id))
+
+    def _append(self, record):
+        self._pending.append(record)
+        self._log_records += 1
+        if len(self._pending) >= self._sync_every:
+            self._wakeup.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._wakeup:
+                self._wakeup.wait_for(
+                    lambda: self._closed
+                    or len(self._pending) >= self._sync_every,
+                    self._sync_interval)
+                closed = self._closed
+            self.sync()
+            if closed:
+                return
+
+    def sync(self):
+        """Writes and fsyncs buffered records, compacting if due."""
+        self._commit(compact=False)
+
+    def compact(self):
+        """Replaces the snapshot with the live flags and empties the log.
+
+        Buffered records are first appended and fsynced to the log, so the
+        log holds every decision in the new snapshot. A crash after the
+        snapshot is moved into place but before the log is emptied then
+        replays that log over the snapshot, which gives the same flags.
+        """
+        self._commit(compact=True)
+
+    def _commit(self, compact):
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                compact = compact or self._log_records >= max(
+                    self._compact_min,
+                    self._compact_ratio * len(self._flags))
+                if compact:
+                    flags = dict(self._flags)
+                    self._log_records = 0
+            if pending:
+                self._log.write(b"".join(pending))
+                self._log.flush()
+                os.fsync(self._log.fileno())
+            if compact:
+                self._write_snapshot(flags)
+
+    def _write_snapshot(self, flags):
+        temporary = self._snapshot_path + ".tmp"
+        with open(temporary, "wb") as snapshot_file:
+            snapshot_file.write(b"".join(
+                _encode(_FLAG, video_id, reason)
+                for video_id, reason in flags.items()))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary, self._snapshot_path)
+        directory = os.open(os.path.dirname(os.path.abspath(self._path)),
+                            os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        self._log.close()
+        self._log = open(self._path, "wb")
+        os.fsync(self._log.fileno())
+
+    def close(self):
+        """Stops the writer, commits buffered records and closes the log."""
+        with self._wakeup:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._writer.join()
+        self._log.close()
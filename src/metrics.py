@@ -0,0 +1,164 @@
+"""Prometheus metrics for the youtube terminal simulator.
+
+Metrics maps a VideoLibrary, the players running on it and optionally a
+CommandStats onto Prometheus text exposition format, and
+start_metrics_server serves it at /metrics from a background thread.
+Every value is read from a counter that the library, players or stats
+already keep up to date, so a scrape costs O(players + commands), never
+a scan of the catalog.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import weakref
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_QUANTILES = (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99"))
+
+
+def _labels(**labels):
+    return "{" + ",".join(
+        '{}="{}"'.format(name, value.replace("\\", "\\\\")
+                         .replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels.items()) + "}"
+
+
+def _format(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
+
+
+class Metrics:
+    """A class used to collect metrics for Prometheus."""
+
+    def __init__(self, video_library, stats=None):
+        """The Metrics class is initialized.
+
+        Args:
+            video_library: The VideoLibrary to report on.
+            stats: Optional CommandStats to report per-command metrics from.
+        """
+        self._video_library = video_library
+        self._stats = stats
+        self._players = weakref.WeakSet()
+        self._players_lock = threading.Lock()
+
+    def add_player(self, video_player):
+        """Includes a player's playlists in the metrics.
+
+        Players are held weakly, so a finished session drops out of the
+        metrics once it is garbage collected.
+        """
+        with self._players_lock:
+            self._players.add(video_player)
+
+    def render(self):
+        """Returns every metric in Prometheus text exposition format."""
+        library = self._video_library
+        with self._players_lock:
+            players = list(self._players)
+        lines = []
+
+        def metric(name, kind, help, samples):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {_format(value)}")
+
+        metric("youtube_videos", "gauge", "Videos in the library.",
+               [("", library.get_number_of_videos())])
+        metric("youtube_legal_videos", "gauge", "Videos that are not flagged.",
+               [("", library.get_number_of_legal_videos())])
+        metric("youtube_flagged_videos", "gauge", "Flagged videos.",
+               [("", library.get_number_of_flagged_videos())])
+        metric("youtube_catalog_load_seconds", "gauge",
+               "Seconds taken to load the catalog at startup.",
+               [("", library.load_seconds)])
+        metric("youtube_catalog_reloads_total", "counter",
+               "Catalog reloads applied.", [("", library.reload_count)])
+        metric("youtube_catalog_last_reload_seconds", "gauge",
+               "Seconds taken by the last catalog reload.",
+               [("", library.last_reload_seconds)])
+        metric("youtube_players", "gauge", "Active player sessions.",
+               [("", len(players))])
+        metric("youtube_playlists", "gauge", "Playlists in all sessions.",
+               [("", sum(len(player.playlists) for player in players))])
+        metric("youtube_playlist_entries", "gauge",
+               "Videos in all playlists in all sessions.",
+               [("", sum(player.get_number_of_playlist_entries()
+                         for player in players))])
+
+        cache = library.search_cache
+        if cache is not None:
+            metric("youtube_search_cache_hits_total", "counter",
+                   "Searches answered from the search cache.",
+                   [("", cache.hits)])
+            metric("youtube_search_cache_misses_total", "counter",
+                   "Searches not found in the search cache.",
+                   [("", cache.misses)])
+            metric("youtube_search_cache_evictions_total", "counter",
+                   "Results evicted from the full search cache.",
+                   [("", cache.evictions)])
+            metric("youtube_search_cache_entries", "gauge",
+                   "Results in the search cache.", [("", len(cache))])
+            metric("youtube_search_cache_bytes", "gauge",
+                   "Approximate memory held by the search cache.",
+                   [("", cache.size_bytes)])
+
+        if self._stats is not None:
+            all_stats = self._stats.get_all_stats()
+            labels = {name: _labels(command=name) for name in all_stats}
+            metric("youtube_commands_total", "counter", "Commands run.",
+                   [(labels[name], stats["calls"])
+                    for name, stats in all_stats.items()])
+            metric("youtube_command_errors_total", "counter",
+                   "Commands that failed.",
+                   [(labels[name], stats["errors"])
+                    for name, stats in all_stats.items()])
+            metric("youtube_command_latency_seconds", "summary",
+                   "Command latency, to within 19%.",
+                   [(_labels(command=name, quantile=quantile), stats[key])
+                    for name, stats in all_stats.items()
+                    for quantile, key in _QUANTILES])
+            for name, stats in all_stats.items():
+                lines.append(f"youtube_command_latency_seconds_sum"
+                             f"{labels[name]} {_format(stats['total'])}")
+                lines.append(f"youtube_command_latency_seconds_count"
+                             f"{labels[name]} {stats['calls']}")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(metrics, host="127.0.0.1", port=9100):
+    """Serves metrics at /metrics from a daemon thread.
+
+    Args:
+        metrics: The Metrics to serve.
+        host: The interface to listen on.
+        port: The port to listen on, 0 for any free port.
+
+    Returns:
+        The running HTTP server; call its shutdown method to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
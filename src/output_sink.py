@@ -0,0 +1,134 @@
+"""Output sink classes used by VideoPlayer and CommandParser."""
+
+import abc
+import sys
+
+
+class OutputSink(abc.ABC):
+    """A class used to represent where player output lines go.
+
+    VideoPlayer and CommandParser write every line of output to a sink
+    instead of printing it. CommandParser brackets each command with begin
+    and end, so sinks can group lines into per-command responses.
+    """
+
+    @abc.abstractmethod
+    def write(self, line):
+        """Writes one line of output, without its line break."""
+
+    def write_lines(self, lines):
+        """Writes several lines of output at once."""
+        for line in lines:
+            self.write(line)
+
+    def begin(self, command):
+        """Marks the start of the output of a command.
+
+        Args:
+            command: The command as a sequence of words.
+        """
+        pass
+
+    def end(self):
+        """Marks the end of the output of the current command."""
+        pass
+
+    def flush(self):
+        """Pushes any buffered output to its destination."""
+        pass
+
+
+class StdoutSink(OutputSink):
+    """A sink that prints every line straight to sys.stdout."""
+
+    def write(self, line):
+        print(line)
+
+    def write_lines(self, lines):
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+
+
+class BufferedSink(OutputSink):
+    """A sink that batches lines into few writes on a text stream."""
+
+    def __init__(self, stream, buffer_size=1 << 16):
+        """The BufferedSink class is initialized.
+
+        Args:
+            stream: The text stream to write to.
+            buffer_size: Roughly how many characters to hold before writing.
+        """
+        self._stream = stream
+        self._buffer_size = buffer_size
+        self._buffer = []
+        self._buffered = 0
+
+    def write(self, line):
+        self._buffer.append(line)
+        self._buffered += len(line) + 1
+        if self._buffered >= self._buffer_size:
+            self.flush()
+
+    def write_lines(self, lines):
+        for line in lines:
+            self._buffer.append(line)
+            self._buffered += len(line) + 1
+        if self._buffered >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._stream.write("\n".join(self._buffer) + "\n")
+            self._buffer = []
+            self._buffered = 0
+        self._stream.flush()
+
+
+class CollectorSink(OutputSink):
+    """A sink that keeps every line in memory."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
+
+    def write_lines(self, lines):
+        self.lines.extend(lines)
+
+    def getvalue(self):
+        """Returns the collected output as printed text."""
+        return "".join(line + "\n" for line in self.lines)
+
+
+class RecordSink(OutputSink):
+    """A sink that groups output into one record per command.
+
+    Each record is a dict with the "command" words and the "output" lines
+    it produced. Output written outside a command gets a record with an
+    empty command.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._current = None
+
+    def _record(self):
+        if self._current is None:
+            self._current = {"command": [], "output": []}
+            self.records.append(self._current)
+        return self._current
+
+    def write(self, line):
+        self._record()["output"].append(line)
+
+    def write_lines(self, lines):
+        self._record()["output"].extend(lines)
+
+    def begin(self, command):
+        self._current = {"command": list(command), "output": []}
+        self.records.append(self._current)
+
+    def end(self):
+        self._current = None
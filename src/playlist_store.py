@@ -0,0 +1,156 @@
+"""Playlist storage classes."""
+
+import sqlite3
+import threading
+
+
+class PlaylistStore:
+    """A class used to represent playlist storage.
+
+    The base class keeps nothing, so playlists only live as long as their
+    VideoPlayer. Persistent stores override every method; VideoPlayer calls
+    them after each successful playlist change. Playlists are identified by
+    their upper-cased name, as in VideoPlayer.playlists.
+    """
+
+    def load(self):
+        """Returns a dict of playlist key to (name, list of video_ids)."""
+        return {}
+
+    def create(self, key, name):
+        """Records a new, empty playlist."""
+        pass
+
+    def add(self, key, video_id):
+        """Records a video appended to a playlist."""
+        pass
+
+    def remove(self, key, video_id):
+        """Records a video removed from a playlist."""
+        pass
+
+    def clear(self, key):
+        """Records that every video was removed from a playlist."""
+        pass
+
+    def delete(self, key):
+        """Records that a playlist was deleted."""
+        pass
+
+    def flush(self):
+        """Makes every recorded change durable."""
+        pass
+
+    def close(self):
+        """Flushes and releases the store."""
+        pass
+
+
+class SqlitePlaylistStore(PlaylistStore):
+    """A class used to keep playlists in an SQLite database.
+
+    The database runs in write-ahead-log mode. Changes are queued and
+    committed together in one transaction once batch_size changes are
+    queued, every flush_interval seconds by a background thread, and on
+    flush() or close(), so commands do not wait for a synchronous disk
+    write each.
+
+    Playlists are keyed only by their upper-cased name, so a store holds
+    one user's playlists and must be given to a single VideoPlayer.
+    """
+
+    def __init__(self, path, batch_size=100, flush_interval=1.0):
+        """The SqlitePlaylistStore class is initialized.
+
+        Args:
+            path: The database file.
+            batch_size: Queued changes that force a commit.
+            flush_interval: Seconds between the background commits.
+        """
+        self._connection = sqlite3.connect(str(path),
+                                           check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS playlists "
+                "(key TEXT PRIMARY KEY, name TEXT NOT NULL)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(position INTEGER PRIMARY KEY, key TEXT NOT NULL, "
+                "video_id TEXT NOT NULL)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_by_key "
+                "ON entries (key, video_id)")
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._pending = []
+        self._closed = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._committer = threading.Thread(target=self._commit_loop,
+                                           daemon=True)
+        self._committer.start()
+
+    def load(self):
+        with self._lock:
+            self._commit()
+            playlists = {
+                key: (name, []) for key, name in self._connection.execute(
+                    "SELECT key, name FROM playlists")}
+            for key, video_id in self._connection.execute(
+                    "SELECT key, video_id FROM entries ORDER BY position"):
+                playlists[key][1].append(video_id)
+        return playlists
+
+    def create(self, key, name):
+        self._queue("INSERT OR REPLACE INTO playlists (key, name) "
+                    "VALUES (?, ?)", (key, name))
+
+    def add(self, key, video_id):
+        self._queue("INSERT INTO entries (key, video_id) VALUES (?, ?)",
+                    (key, video_id))
+
+    def remove(self, key, video_id):
+        self._queue("DELETE FROM entries WHERE key = ? AND video_id = ?",
+                    (key, video_id))
+
+    def clear(self, key):
+        self._queue("DELETE FROM entries WHERE key = ?", (key,))
+
+    def delete(self, key):
+        self.clear(key)
+        self._queue("DELETE FROM playlists WHERE key = ?", (key,))
+
+    def _queue(self, statement, parameters):
+        with self._lock:
+            self._pending.append((statement, parameters))
+            if len(self._pending) >= self._batch_size:
+                self._commit()
+
+    def _commit_loop(self):
+        with self._wakeup:
+            while not self._wakeup.wait_for(lambda: self._closed,
+                                            self._flush_interval):
+                self._commit()
+
+    def _commit(self):
+        if self._pending:
+            with self._connection:
+                for statement, parameters in self._pending:
+                    self._connection.execute(statement, parameters)
+            self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        with self._wakeup:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._committer.join()
+        self.flush()
+        self._connection.close()
@@ -1,21 +1,174 @@
 """A youtube terminal simulator."""
 from .video_player import VideoPlayer
+from .catalog_watcher import CatalogWatcher
 from .command_parser import CommandException
 from .command_parser import CommandParser
+from .command_stats import CommandStats
+from .flag_store import FlagStore
+from .playlist_store import SqlitePlaylistStore
+from .metrics import Metrics, start_metrics_server
+from .video_library import VideoLibrary
+from .output_sink import BufferedSink
+import argparse
+import contextlib
+import sys
+import time
 
 
-if __name__ == "__main__":
+def run_interactive(stats=None, metrics_port=None, watch=None,
+                    video_library=None, playlist_store=None):
+    """Reads commands from the user until EXIT.
+
+    Args:
+        stats: Optional CommandStats to record commands in.
+        metrics_port: If set, Prometheus metrics are served on this port.
+        watch: If set, the catalog file is checked for changes every this
+            many seconds and reloaded when it changes.
+        video_library: The VideoLibrary to use, defaults to a new one over
+            the bundled catalog.
+        playlist_store: Optional PlaylistStore to keep playlists in.
+    """
     print("""Hello and welcome to YouTube, what would you like to do?
     Enter HELP for list of available commands or EXIT to terminate.""")
-    video_player = VideoPlayer()
-    parser = CommandParser(video_player)
-    while True:
-        command = input("YT> ")
-        if command.upper() == "EXIT":
+    if video_library is None:
+        video_library = VideoLibrary()
+    video_player = VideoPlayer(video_library, playlist_store)
+    parser = CommandParser(video_player, stats=stats)
+    if metrics_port is not None:
+        metrics = Metrics(video_library, stats)
+        metrics.add_player(video_player)
+        start_metrics_server(metrics, port=metrics_port)
+    watcher = None
+    if watch is not None:
+        watcher = CatalogWatcher(video_library, watch)
+        watcher.start()
+    try:
+        while True:
+            command = input("YT> ")
+            if command.upper() == "EXIT":
+                break
+            try:
+                parser.execute_command(command.split())
+            except CommandException as e:
+                print(e)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+    print("YouTube has now terminated its execution. "
+          "Thank you and goodbye!")
+
+
+def run_batch(commands, output, answer=None, stats=None,
+              video_library=None, playlist_store=None):
+    """Runs a stream of commands without prompting.
+
+    Args:
+        commands: An iterable of command lines. Blank lines are skipped and
+            an EXIT line ends the run.
+        output: The text stream results are written to.
+        answer: The answer given to every search prompt. If None, the line
+            following a search command answers its prompt, as when typing.
+        stats: Optional CommandStats to record commands in.
+        video_library: The VideoLibrary to use, defaults to a new one over
+            the bundled catalog.
+        playlist_store: Optional PlaylistStore to keep playlists in.
+
+    Returns:
+        The number of commands executed.
+    """
+    lines = iter(commands)
+    if answer is None:
+        def read_answer():
+            return next(lines, "").rstrip("\n")
+    else:
+        def read_answer():
+            return answer
+    sink = BufferedSink(output)
+    parser = CommandParser(VideoPlayer(video_library, playlist_store,
+                                       read_answer=read_answer, sink=sink),
+                           stats=stats)
+    executed = 0
+    for command in lines:
+        command = command.split()
+        if not command:
+            continue
+        if command[0].upper() == "EXIT":
             break
         try:
-            parser.execute_command(command.split())
+            parser.execute_command(command)
         except CommandException as e:
-            print(e)
-    print("YouTube has now terminated its execution. "
-          "Thank you and goodbye!")
+            sink.write(str(e))
+        executed += 1
+    sink.flush()
+    return executed
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(
+        prog="python3 -m src.run", description=__doc__)
+    argument_parser.add_argument(
+        "--batch", metavar="FILE",
+        help="run the commands in FILE ('-' for stdin) instead of "
+             "prompting")
+    argument_parser.add_argument(
+        "--answer", metavar="TEXT",
+        help="in batch mode, answer every search prompt with TEXT instead "
+             "of reading the next line")
+    argument_parser.add_argument(
+        "--stats", action="store_true",
+        help="time every command, enabling the STATS command; in batch "
+             "mode the statistics are also printed on stderr at the end")
+    argument_parser.add_argument(
+        "--metrics-port", type=int, metavar="PORT",
+        help="serve Prometheus metrics on PORT at /metrics while running "
+             "interactively")
+    argument_parser.add_argument(
+        "--watch", type=float, nargs="?", const=1.0, metavar="SECONDS",
+        help="while running interactively, reload the catalog when its "
+             "file changes, checking every SECONDS (default 1)")
+    argument_parser.add_argument(
+        "--flag-log", metavar="FILE",
+        help="keep flagged videos in FILE, so flags survive restarts")
+    argument_parser.add_argument(
+        "--playlist-db", metavar="FILE",
+        help="keep playlists in the SQLite database FILE, so they survive "
+             "restarts")
+    arguments = argument_parser.parse_args(argv)
+    stats = CommandStats() if arguments.stats else None
+    with contextlib.ExitStack() as stores:
+        flag_store = playlist_store = None
+        if arguments.flag_log is not None:
+            flag_store = FlagStore(arguments.flag_log)
+            stores.callback(flag_store.close)
+        if arguments.playlist_db is not None:
+            playlist_store = SqlitePlaylistStore(arguments.playlist_db)
+            stores.callback(playlist_store.close)
+        video_library = VideoLibrary(flag_store=flag_store)
+        if arguments.batch is None:
+            run_interactive(stats, arguments.metrics_port, arguments.watch,
+                            video_library, playlist_store)
+        else:
+            _main_batch(arguments, stats, video_library, playlist_store)
+
+
+def _main_batch(arguments, stats, video_library, playlist_store):
+    if arguments.batch == "-":
+        commands = contextlib.nullcontext(sys.stdin)
+    else:
+        commands = open(arguments.batch)
+    output = open(sys.stdout.fileno(), "w", buffering=1 << 20,
+                  closefd=False)
+    start = time.perf_counter()
+    with commands as lines, output:
+        executed = run_batch(lines, output, arguments.answer, stats,
+                             video_library, playlist_store)
+    elapsed = time.perf_counter() - start
+    print(f"Executed {executed} commands in {elapsed:.3f}s "
+          f"({executed / elapsed if elapsed else 0:.0f} commands/s)",
+          file=sys.stderr)
+    if stats is not None:
+        print("\n".join(stats.format_lines()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
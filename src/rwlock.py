@@ -0,0 +1,82 @@
+"""A reader/writer lock class."""
+
+import threading
+
+
+class ReadWriteLock:
+    """A class used to let many readers or one writer hold a lock.
+
+    Writers are preferred: once a writer is waiting, new readers wait
+    behind it, so a steady stream of searches cannot starve a flag change.
+    The lock is not reentrant; a thread holding either side must not
+    acquire it again.
+
+    Usage:
+        with lock.read:
+            ...
+        with lock.write:
+            ...
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+        self.read = _ReadSide(self)
+        self.write = _WriteSide(self)
+
+    def acquire_read(self):
+        """Waits until no writer holds or waits for the lock, then reads."""
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """Releases a read hold."""
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        """Waits until the lock is free, then holds it alone."""
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+
+    def release_write(self):
+        """Releases the write hold."""
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
+
+class _ReadSide:
+    __slots__ = ("_lock",)
+
+    def __init__(self, lock):
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire_read()
+
+    def __exit__(self, *exc_info):
+        self._lock.release_read()
+
+
+class _WriteSide:
+    __slots__ = ("_lock",)
+
+    def __init__(self, lock):
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire_write()
+
+    def __exit__(self, *exc_info):
+        self._lock.release_write()
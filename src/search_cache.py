@@ -0,0 +1,93 @@
+"""A search result cache class."""
+
+from collections import OrderedDict
+import sys
+import threading
+
+# Approximate bytes held by a cached entry besides its result ids: the
+# OrderedDict slot, the key tuple and the entry tuple.
+_ENTRY_OVERHEAD = 200
+_POINTER_SIZE = 8
+
+
+class SearchCache:
+    """A class used to keep the most recently used search results.
+
+    Results are ordered tuples of video ids, stored with the generation of
+    the library they were computed from. The library bumps its generation
+    on every change that can alter a result, so a lookup with a newer
+    generation misses and drops the stale entry. The cache is bounded both
+    by number of entries and by the approximate bytes its results hold;
+    the ids themselves are shared with the catalog, so a result costs one
+    pointer per id.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=16 << 20):
+        """The SearchCache class is initialized.
+
+        Args:
+            max_entries: The most results kept.
+            max_bytes: Roughly the most memory the kept results may hold.
+                A result bigger than this is never cached.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        """Returns the cached result for a query, or None on a miss.
+
+        Args:
+            key: The normalised query.
+            generation: The library's current generation.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == generation:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._discard(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, generation, video_ids):
+        """Caches the result of a query.
+
+        Args:
+            key: The normalised query.
+            generation: The library generation the result was computed at.
+            video_ids: The ordered result ids.
+        """
+        video_ids = tuple(video_ids)
+        size = (_ENTRY_OVERHEAD + sys.getsizeof(key[-1])
+                + _POINTER_SIZE * len(video_ids))
+        if size > self.max_bytes or not self.max_entries:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (generation, video_ids, size)
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or \
+                    self.size_bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _discard(self, key):
+        self.size_bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        """Drops every cached result, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,208 @@
+"""A line protocol server for the youtube terminal simulator.
+
+Clients send one command per line. Every reply is the command's output,
+one line each, followed by a terminator line: "." when the command is
+done, or ".?" when a search is waiting for the client's answer to "play
+any of the above?", which the client sends as its next line. Output lines
+starting with "." are sent with an extra leading ".". The server greets
+each connection with a reply, and EXIT closes it.
+
+Each connection gets its own VideoPlayer (playback state and playlists)
+over one shared VideoLibrary. Run it with:
+
+    python3 -m src.server [--host HOST] [--port PORT] [--stats]
+        [--metrics-port PORT] [--watch [SECONDS]] [--flag-log FILE]
+
+With --stats, every session's commands are timed together and the STATS
+command shows the statistics. With --metrics-port, Prometheus metrics for
+the library, the sessions and (with --stats) the commands are served over
+HTTP at /metrics. With --watch, the catalog file is reloaded whenever it
+changes. With --flag-log, flags are kept in a log file across restarts.
+Playlists are not stored: a client has no identity beyond its connection,
+so each session's playlists last as long as the connection.
+"""
+
+from .catalog_watcher import CatalogWatcher
+from .command_parser import CommandException, CommandParser
+from .command_stats import CommandStats
+from .flag_store import FlagStore
+from .metrics import Metrics, start_metrics_server
+from .output_sink import CollectorSink
+from .video_library import VideoLibrary
+from .video_player import VideoPlayer
+import argparse
+import asyncio
+
+DONE = "."
+AWAITING_ANSWER = ".?"
+
+
+class Session:
+    """A class used to represent one client's player session."""
+
+    def __init__(self, video_library, stats=None, metrics=None):
+        """The Session class is initialized.
+
+        Args:
+            video_library: The VideoLibrary shared by every session.
+            stats: Optional CommandStats shared by every session.
+            metrics: Optional Metrics that the session's player reports to.
+        """
+        self._sink = CollectorSink()
+        self.player = VideoPlayer(video_library, read_answer=lambda: None,
+                                  sink=self._sink)
+        self._parser = CommandParser(self.player, stats=stats)
+        if metrics is not None:
+            metrics.add_player(self.player)
+
+    def handle_line(self, line):
+        """Runs one line from the client.
+
+        Args:
+            line: A command, or the answer to a pending search prompt.
+
+        Returns:
+            The output lines and the terminator to send back.
+        """
+        if self.player.awaiting_answer:
+            self.player.answer_search(line.strip())
+        else:
+            try:
+                self._parser.execute_command(line.split())
+            except CommandException as e:
+                self._sink.write(str(e))
+        lines, self._sink.lines = self._sink.lines, []
+        return lines, AWAITING_ANSWER if self.player.awaiting_answer else DONE
+
+
+def _encode_reply(lines, terminator):
+    return "".join(
+        ("." + line if line.startswith(".") else line) + "\n"
+        for line in lines).encode() + terminator.encode() + b"\n"
+
+
+async def handle_client(reader, writer, video_library, stats=None,
+                        metrics=None):
+    """Serves one client connection until EXIT or disconnect.
+
+    Commands run in the event loop's default executor, so a slow command
+    does not hold up the other connections. A line that is not valid UTF-8
+    gets an error reply; a line longer than the reader's limit gets an
+    error reply and closes the connection, as the rest of it cannot be
+    told apart from the next command.
+    """
+    loop = asyncio.get_running_loop()
+    session = Session(video_library, stats, metrics)
+    writer.write(_encode_reply(
+        ["Hello and welcome to YouTube, what would you like to do?",
+         "Enter HELP for list of available commands or EXIT to terminate."],
+        DONE))
+    try:
+        while True:
+            await writer.drain()
+            try:
+                data = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                writer.write(_encode_reply(["Line is too long"], DONE))
+                await writer.drain()
+                break
+            if not data:
+                break
+            try:
+                line = data.decode().rstrip("\r\n")
+            except UnicodeDecodeError:
+                writer.write(_encode_reply(
+                    ["Line is not valid UTF-8"],
+                    AWAITING_ANSWER if session.player.awaiting_answer
+                    else DONE))
+                continue
+            if not session.player.awaiting_answer and \
+                    line.strip().upper() == "EXIT":
+                writer.write(_encode_reply(
+                    ["YouTube has now terminated its execution. "
+                     "Thank you and goodbye!"], DONE))
+                await writer.drain()
+                break
+            writer.write(_encode_reply(*await loop.run_in_executor(
+                None, session.handle_line, line)))
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def start_server(video_library, host="127.0.0.1", port=8765,
+                       stats=None, metrics=None):
+    """Starts serving sessions over a shared library.
+
+    Args:
+        video_library: The VideoLibrary shared by every session.
+        host: The interface to listen on.
+        port: The port to listen on, 0 for any free port.
+        stats: Optional CommandStats recording every session's commands.
+        metrics: Optional Metrics that every session reports to.
+
+    Returns:
+        The listening asyncio.Server.
+    """
+    return await asyncio.start_server(
+        lambda reader, writer: handle_client(reader, writer, video_library,
+                                             stats, metrics),
+        host, port)
+
+
+async def _serve(host, port, stats, metrics_port, watch, flag_store):
+    video_library = VideoLibrary.shared(flag_store=flag_store)
+    metrics = None
+    if metrics_port is not None:
+        metrics = Metrics(video_library, stats)
+        start_metrics_server(metrics, host, metrics_port)
+    watcher = None
+    if watch is not None:
+        watcher = CatalogWatcher(video_library, watch)
+        watcher.start()
+    server = await start_server(video_library, host, port, stats, metrics)
+    for socket in server.sockets:
+        print(f"Serving on {socket.getsockname()}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if watcher is not None:
+            watcher.stop()
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        prog="python3 -m src.server",
+        description="Serve youtube terminal sessions over TCP.")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    argument_parser.add_argument("--port", type=int, default=8765)
+    argument_parser.add_argument("--stats", action="store_true",
+                                 help="time commands for the STATS command")
+    argument_parser.add_argument("--metrics-port", type=int,
+                                 help="serve Prometheus metrics on this port")
+    argument_parser.add_argument("--watch", type=float, nargs="?", const=1.0,
+                                 metavar="SECONDS",
+                                 help="reload the catalog when it changes, "
+                                      "checking every SECONDS (default 1)")
+    argument_parser.add_argument("--flag-log", metavar="FILE",
+                                 help="keep flagged videos in FILE")
+    arguments = argument_parser.parse_args()
+    flag_store = None
+    if arguments.flag_log is not None:
+        flag_store = FlagStore(arguments.flag_log)
+    try:
+        asyncio.run(_serve(arguments.host, arguments.port,
+                           CommandStats() if arguments.stats else None,
+                           arguments.metrics_port, arguments.watch,
+                           flag_store))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if flag_store is not None:
+            flag_store.close()
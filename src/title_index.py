@@ -0,0 +1,81 @@
+"""A substring search index over video titles."""
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TitleIndex:
+    """A class used to find the videos whose titles contain a substring.
+
+    Every upper-cased title is split into its three character substrings
+    (trigrams), and each trigram keeps the set of video ids whose title
+    contains it. A query is answered by intersecting the posting sets of
+    its own trigrams, smallest first, and then checking the few remaining
+    candidates. Queries shorter than three characters fall back to a scan
+    of the stored upper-cased titles.
+    """
+
+    def __init__(self):
+        self._titles = {}
+        self._postings = {}
+
+    def add(self, video_id, title):
+        """Indexes the title of a video.
+
+        Args:
+            video_id: The video id.
+            title: The video title.
+        """
+        title = title.upper()
+        self._titles[video_id] = title
+        for trigram in _trigrams(title):
+            self._postings.setdefault(trigram, set()).add(video_id)
+
+    def remove(self, video_id):
+        """Removes a video from the index.
+
+        Args:
+            video_id: The video id.
+        """
+        title = self._titles.pop(video_id, None)
+        if title is None:
+            return
+        for trigram in _trigrams(title):
+            video_ids = self._postings[trigram]
+            video_ids.discard(video_id)
+            if not video_ids:
+                del self._postings[trigram]
+
+    def search(self, search_term):
+        """Returns the ids of videos whose titles contain search_term.
+
+        Args:
+            search_term: The substring to look for, in any case.
+
+        Returns:
+            A set of video ids.
+        """
+        search_term = search_term.upper()
+        if len(search_term) < 3:
+            return {video_id for video_id, title in self._titles.items()
+                    if search_term in title}
+        postings = []
+        for trigram in _trigrams(search_term):
+            video_ids = self._postings.get(trigram)
+            if video_ids is None:
+                return set()
+            postings.append(video_ids)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for video_ids in postings[1:]:
+            candidates &= video_ids
+            if not candidates:
+                return candidates
+        if len(search_term) == 3:
+            return candidates
+        return {video_id for video_id in candidates
+                if search_term in self._titles[video_id]}
+
+    def __len__(self):
+        return len(self._titles)
@@ -6,6 +6,9 @@ from typing import Sequence
 class Video:
     """A class used to represent a Video."""
 
+    # Catalogs hold millions of videos, so skip the per-instance __dict__.
+    __slots__ = ("_title", "_video_id", "_tags")
+
     def __init__(self, video_title: str, video_id: str, video_tags: Sequence[str]):
         """Video constructor."""
         self._title = video_title
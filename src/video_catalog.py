@@ -0,0 +1,301 @@
+"""Video catalog loaders."""
+
+from .video import Video
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+import abc
+import csv
+import logging
+import mmap
+import os
+import sys
+
+_logger = logging.getLogger(__name__)
+
+
+# Helper Wrapper around CSV reader to strip whitespace from around
+# each item.
+def _csv_reader_with_strip(reader):
+    yield from ((item.strip() for item in line) for line in reader)
+
+
+def video_from_fields(fields, tag_tuples=None):
+    """Builds a Video from the stripped fields of one videos.txt row.
+
+    Tag strings are interned, so a tag used by many videos is stored once.
+
+    Args:
+        fields: The (title, video_id, tags) strings of a row.
+        tag_tuples: Optional dict used to share one tags tuple between all
+            the videos with the same tags.
+
+    Returns:
+        The Video object described by the row.
+    """
+    title, url, tags = fields
+    tags = tuple(sys.intern(tag.strip()) for tag in tags.split(",")) \
+        if tags else ()
+    if tag_tuples is not None:
+        tags = tag_tuples.setdefault(tags, tags)
+    return Video(title, url, tags)
+
+
+def _warn_duplicates(path, duplicates):
+    if duplicates:
+        _logger.warning("%s: %d rows repeat an earlier video id; the last "
+                        "row of each id is used", path, duplicates)
+
+
+def _load_rows(lines):
+    """Parses rows into a dict of video_id to Video and a duplicate count."""
+    videos = {}
+    tag_tuples = {}
+    rows = 0
+    for video_info in _csv_reader_with_strip(
+            csv.reader(lines, delimiter="|")):
+        video = video_from_fields(tuple(video_info), tag_tuples)
+        videos[video.video_id] = video
+        rows += 1
+    return videos, rows - len(videos)
+
+
+def load_catalog(path):
+    """Parses a whole videos.txt file.
+
+    A video_id repeated on later rows is logged as a warning, and the last
+    row with it wins.
+
+    Args:
+        path: The path of a videos.txt formatted file.
+
+    Returns:
+        A dict of video_id to Video, in file order.
+    """
+    with open(path) as video_file:
+        videos, duplicates = _load_rows(video_file)
+    _warn_duplicates(path, duplicates)
+    return videos
+
+
+def _split_at_lines(path, chunks):
+    """Returns (start, end) byte ranges of path that end at line breaks."""
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as video_file:
+        for chunk in range(1, chunks):
+            position = max(size * chunk // chunks, boundaries[-1])
+            video_file.seek(position)
+            video_file.readline()
+            boundaries.append(min(video_file.tell(), size))
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:])
+            if start < end]
+
+
+def _parse_chunk(path, start, end):
+    """Parses the rows in a byte range, as _load_rows does."""
+    with open(path, "rb") as video_file:
+        video_file.seek(start)
+        lines = video_file.read(end - start).decode().splitlines()
+    return _load_rows(lines)
+
+
+def load_catalog_parallel(path, workers=None, min_chunk_size=1 << 20):
+    """Parses a whole videos.txt file using a pool of processes.
+
+    The file is split into byte ranges at line boundaries and each range
+    is parsed in its own process, which builds the Video objects. Tags come
+    back from each process as separate copies, so while merging the chunks
+    in file order this process points every video at one shared, interned
+    tags tuple, as load_catalog does.
+    A video_id repeated within or across chunks resolves exactly as in
+    load_catalog: the last row wins, and the repeats are logged. Rows must
+    not contain quoted line breaks.
+
+    Args:
+        path: The path of a videos.txt formatted file.
+        workers: The number of processes, defaults to the CPU count.
+        min_chunk_size: Files are not split into chunks smaller than this
+            many bytes; small files are parsed in this process.
+
+    Returns:
+        A dict of video_id to Video, in file order.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = min(workers, os.path.getsize(path) // min_chunk_size)
+    if chunks <= 1:
+        return load_catalog(path)
+    ranges = _split_at_lines(path, chunks)
+    videos = {}
+    tag_tuples = {}
+    duplicates = 0
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(_parse_chunk, path, start, end)
+                   for start, end in ranges]
+        for future in futures:
+            chunk, chunk_duplicates = future.result()
+            for video in chunk.values():
+                shared = tag_tuples.get(video._tags)
+                if shared is None:
+                    shared = tag_tuples[video._tags] = tuple(
+                        sys.intern(tag) for tag in video._tags)
+                video._tags = shared
+            duplicates += chunk_duplicates + len(chunk.keys() & videos.keys())
+            videos.update(chunk)
+    _warn_duplicates(path, duplicates)
+    return videos
+
+
+class OverlayCatalog(MutableMapping):
+    """A mapping of video_id to Video over a read-only stored catalog.
+
+    Subclasses provide the stored videos through _materialise, _has, _ids
+    and _count. Videos are materialised on first lookup and cached, and
+    videos added or deleted after loading are kept in an in-memory overlay
+    rather than written back.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._added = {}
+        self._removed = set()
+        self._length_change = 0
+
+    @abc.abstractmethod
+    def _materialise(self, video_id):
+        """Returns the stored Video for video_id, or raises KeyError."""
+
+    @abc.abstractmethod
+    def _has(self, video_id):
+        """Returns True if video_id is in the stored catalog."""
+
+    @abc.abstractmethod
+    def _ids(self):
+        """Returns an iterator over the stored video ids."""
+
+    @abc.abstractmethod
+    def _count(self):
+        """Returns the number of stored videos."""
+
+    def __getitem__(self, video_id):
+        video = self._added.get(video_id)
+        if video is not None:
+            return video
+        if video_id in self._removed:
+            raise KeyError(video_id)
+        video = self._cache.get(video_id)
+        if video is None:
+            video = self._materialise(video_id)
+            self._cache[video_id] = video
+        return video
+
+    def __setitem__(self, video_id, video):
+        if video_id not in self:
+            self._length_change += 1
+        self._added[video_id] = video
+
+    def __delitem__(self, video_id):
+        if video_id not in self:
+            raise KeyError(video_id)
+        self._length_change -= 1
+        self._added.pop(video_id, None)
+        self._cache.pop(video_id, None)
+        if self._has(video_id):
+            self._removed.add(video_id)
+
+    def __contains__(self, video_id):
+        if video_id in self._added:
+            return True
+        return video_id not in self._removed and self._has(video_id)
+
+    def __iter__(self):
+        for video_id in self._ids():
+            if video_id not in self._removed and video_id not in self._added:
+                yield video_id
+        yield from self._added
+
+    def __len__(self):
+        return self._count() + self._length_change
+
+    def number_materialised(self):
+        """Returns how many stored videos have been parsed into Videos."""
+        return len(self._cache)
+
+
+class LazyCatalog(OverlayCatalog):
+    """A mapping of video_id to Video backed by a memory map.
+
+    Opening the catalog only records the byte offset at which each row
+    starts, keyed by video_id. A row is parsed into a Video the first time
+    it is looked up, and the result is cached.
+    """
+
+    def __init__(self, path):
+        """The catalog is opened and its offset index is built.
+
+        Args:
+            path: The path of a videos.txt formatted file.
+        """
+        self._file = open(path, "rb")
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be memory mapped.
+            self._data = b""
+        self._offsets = {}
+        self._tag_tuples = {}
+        self._build_index()
+        super().__init__()
+
+    def _build_index(self):
+        data = self._data
+        start = 0
+        end_of_data = len(data)
+        while start < end_of_data:
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = end_of_data
+            line = data[start:end]
+            if b'"' in line:
+                fields = self._parse_line(line)
+                video_id = fields[1] if fields and len(fields) == 3 else None
+            else:
+                fields = line.split(b"|")
+                video_id = fields[1].strip().decode() \
+                    if len(fields) == 3 else None
+            if video_id is not None:
+                self._offsets[video_id] = start
+            start = end + 1
+
+    @staticmethod
+    def _parse_line(line):
+        """Returns the stripped fields of a raw row, or None if blank."""
+        text = line.decode().rstrip("\r")
+        if not text.strip():
+            return None
+        fields = next(csv.reader([text], delimiter="|"))
+        return [field.strip() for field in fields]
+
+    def _materialise(self, video_id):
+        start = self._offsets[video_id]
+        end = self._data.find(b"\n", start)
+        if end == -1:
+            end = len(self._data)
+        return video_from_fields(self._parse_line(self._data[start:end]),
+                                 self._tag_tuples)
+
+    def _has(self, video_id):
+        return video_id in self._offsets
+
+    def _ids(self):
+        return iter(self._offsets)
+
+    def _count(self):
+        return len(self._offsets)
+
+    def close(self):
+        """Releases the memory map and the underlying file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
@@ -1,40 +1,353 @@
 """A video library class."""
 
-from .video import Video
+from .catalog_snapshot import open_snapshot
+from .rwlock import ReadWriteLock
+from .search_cache import SearchCache
+from .title_index import TitleIndex
+from .video_catalog import LazyCatalog, load_catalog, load_catalog_parallel
+from collections import namedtuple
 from pathlib import Path
-import csv
+import bisect
+import heapq
+import itertools
+import math
+import os
+import random
+import threading
+import time
+import weakref
 
+# Libraries handed out by VideoLibrary.shared, with the options they were
+# constructed with, keyed by resolved path.
+_shared_libraries = {}
+_shared_libraries_lock = threading.Lock()
 
-# Helper Wrapper around CSV reader to strip whitespace from around
-# each item.
-def _csv_reader_with_strip(reader):
-    yield from ((item.strip() for item in line) for line in reader)
+# The video ids added, removed and changed by VideoLibrary.reload.
+CatalogChanges = namedtuple("CatalogChanges", "added removed changed")
+
+# One page of search results: the Videos on it, ordered by title, and the
+# number of matches on all pages.
+ResultPage = namedtuple("ResultPage", "videos total")
 
 
 class VideoLibrary:
-    """A class used to represent a Video Library."""
+    """A class used to represent a Video Library.
+
+    A library may be shared by sessions on many threads. Lookups, listings
+    and searches hold its lock for reading and run concurrently; flagging,
+    allowing, adding and removing videos hold it briefly for writing.
+    """
 
-    def __init__(self):
-        """The VideoLibrary class is initialized."""
-        self._videos = {}
+    def __init__(self, path=None, lazy=False, snapshot=False, workers=None,
+                 flag_store=None, cache_entries=256, cache_bytes=16 << 20):
+        """The VideoLibrary class is initialized.
+
+        Args:
+            path: The videos.txt file to load, defaults to the bundled one.
+            lazy: If True, the file is memory mapped and only indexed by
+                video_id; each Video is parsed the first time it is used.
+            snapshot: If True (or a snapshot path), the library is served
+                from a binary snapshot of the file, which is compiled first
+                if it is missing or out of date.
+            workers: If set, the file is parsed in parallel by this many
+                processes. Only applies to the default eager loading.
+            flag_store: Optional FlagStore that flags are loaded from and
+                written through to. Under the library's lock the store
+                only buffers the change; its writer thread does the I/O.
+            cache_entries: The most search results kept in search_cache,
+                0 to disable the cache.
+            cache_bytes: Roughly the most memory the kept results may hold.
+        """
+        if sum(map(bool, (lazy, snapshot, workers))) > 1:
+            raise ValueError("lazy, snapshot and parallel loading are "
+                             "exclusive")
+        if path is None:
+            path = Path(__file__).parent / "videos.txt"
+        self._path = path
+        self._lazy = lazy
+        self._snapshot = snapshot
+        self._workers = workers
+        self._flag_store = flag_store
+        self._lock = ReadWriteLock()
+        self._reload_lock = threading.Lock()
+        # Counts add_video and remove_video calls, so reload can tell
+        # whether the catalog changed while it was comparing files.
+        self._modifications = 0
+        # Bumped by every change that can alter a search result, so
+        # search_cache entries from before it are never served.
+        self._generation = 0
+        self.search_cache = None
+        if cache_entries:
+            self.search_cache = SearchCache(cache_entries, cache_bytes)
+        # Load statistics: seconds taken by the initial load (including
+        # eager index builds), reloads applied and the last one's seconds.
+        self.load_seconds = 0.0
+        self.reload_count = 0
+        self.last_reload_seconds = 0.0
+        start = time.perf_counter()
+        self._source_state = self._stat_source()
+        self._videos = self._open_catalog()
+        # Flags are kept by id even while their video is missing from the
+        # catalog, so a video that comes back is still flagged and the
+        # flags stay in step with the flag store. _absent_flags holds the
+        # flagged ids that are not in the catalog.
         self.flagged = {}
-        with open(Path(__file__).parent / "videos.txt") as video_file:
-            reader = _csv_reader_with_strip(
-                csv.reader(video_file, delimiter="|"))
-            for video_info in reader:
-                title, url, tags = video_info
-                self._videos[url] = Video(
-                    title,
-                    url,
-                    [tag.strip() for tag in tags.split(",")] if tags else [],
-                )
+        if flag_store is not None:
+            self.flagged = flag_store.load()
+        self._absent_flags = {video_id for video_id in self.flagged
+                              if video_id not in self._videos}
+        self._removal_listeners = []
+        self._flag_listeners = []
+        self._listeners_lock = threading.Lock()
+        # Search indexes. Upper-cased tag -> ids of the legal videos
+        # carrying it, a substring index over every title and every
+        # (title, video_id) pair in sorted order. Lazily loaded catalogs
+        # build them on first use so startup stays cheap.
+        self._tag_index = None
+        self._title_index = None
+        self._title_order = None
+        # Pool of legal video ids with each id's position in it, so a
+        # flag can swap-remove an id and random picks are O(1).
+        self._legal_ids = None
+        self._legal_positions = None
+        if not (lazy or snapshot):
+            self._build_indexes()
+            self._build_legal_pool()
+        self.load_seconds = time.perf_counter() - start
+
+    @classmethod
+    def shared(cls, path=None, **options):
+        """Returns the process-wide library for a catalog file.
+
+        The first call for a path loads it; later calls return the same
+        instance, so many VideoPlayer sessions can share one catalog.
+
+        Args:
+            path: The videos.txt file, defaults to the bundled one.
+            options: Keyword arguments for the first VideoLibrary
+                constructed for this path. Later calls may omit them or
+                repeat them.
+
+        Raises:
+            ValueError: If the library for this path was constructed with
+                different options.
+        """
+        if path is None:
+            path = Path(__file__).parent / "videos.txt"
+        key = Path(path).resolve()
+        with _shared_libraries_lock:
+            shared = _shared_libraries.get(key)
+            if shared is None:
+                shared = _shared_libraries[key] = (cls(path, **options),
+                                                   options)
+            elif options and options != shared[1]:
+                raise ValueError(
+                    f"Shared library for {key} already loaded with "
+                    f"options {shared[1]}, not {options}")
+            return shared[0]
+
+    def _stat_source(self):
+        stat = os.stat(self._path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _open_catalog(self):
+        if self._lazy:
+            return LazyCatalog(self._path)
+        if self._snapshot:
+            return open_snapshot(
+                self._path, None if self._snapshot is True else self._snapshot)
+        if self._workers:
+            return load_catalog_parallel(self._path, self._workers)
+        return load_catalog(self._path)
+
+    def _build_indexes(self):
+        self._tag_index = {}
+        self._title_index = TitleIndex()
+        title_order = []
+        for video in self._videos.values():
+            self._title_index.add(video._video_id, video._title)
+            title_order.append((video._title, video._video_id))
+            if video._video_id not in self.flagged:
+                self._add_to_tag_index(video)
+        title_order.sort()
+        self._title_order = title_order
+
+    def _ensure_indexes(self):
+        """Builds the search indexes if needed. Call without the lock."""
+        if self._tag_index is None:
+            with self._lock.write:
+                if self._tag_index is None:
+                    self._build_indexes()
+
+    def _ensure_legal_pool(self):
+        """Builds the legal pool if needed. Call without the lock."""
+        if self._legal_ids is None:
+            with self._lock.write:
+                if self._legal_ids is None:
+                    self._build_legal_pool()
+
+    def _build_legal_pool(self):
+        self._legal_ids = [video_id for video_id in self._videos
+                           if video_id not in self.flagged]
+        self._legal_positions = {
+            video_id: position
+            for position, video_id in enumerate(self._legal_ids)}
+
+    def _add_to_legal_pool(self, video_id):
+        self._legal_positions[video_id] = len(self._legal_ids)
+        self._legal_ids.append(video_id)
+
+    def _remove_from_legal_pool(self, video_id):
+        position = self._legal_positions.pop(video_id)
+        last = self._legal_ids.pop()
+        if last != video_id:
+            self._legal_ids[position] = last
+            self._legal_positions[last] = position
+
+    def _in_title_order(self, video_ids):
+        """Returns a collection of ids ordered by title.
+
+        Large result sets are read off the sorted title view; small ones
+        are cheaper to sort directly than to filter the whole view.
+        """
+        count = len(video_ids)
+        if count * math.log2(count + 1) < len(self._title_order):
+            return [video_id for _, video_id in
+                    sorted((self._videos[video_id]._title, video_id)
+                           for video_id in video_ids)]
+        if not isinstance(video_ids, (set, dict)):
+            video_ids = set(video_ids)
+        return [video_id for _, video_id in self._title_order
+                if video_id in video_ids]
+
+    def _title_matches(self, search_term):
+        video_ids = self._title_index.search(search_term)
+        if self.flagged:
+            video_ids.difference_update(self.flagged)
+        return video_ids
+
+    def _cached_search(self, key, find):
+        """Returns the title ordered ids of a search, cached if possible.
+
+        Args:
+            key: The normalised query.
+            find: Called to find the matching ids on a cache miss.
+        """
+        if self.search_cache is None:
+            return self._in_title_order(find())
+        video_ids = self.search_cache.get(key, self._generation)
+        if video_ids is None:
+            video_ids = self._in_title_order(find())
+            self.search_cache.put(key, self._generation, video_ids)
+        return video_ids
+
+    def _cached_page(self, key, find, offset, limit, after):
+        """Returns a ResultPage of a search, sliced from its cached result
+        if there is one.
+        """
+        if self.search_cache is not None and after is None:
+            video_ids = self.search_cache.get(key, self._generation)
+            if video_ids is not None:
+                return ResultPage(
+                    [self._videos[video_id]
+                     for video_id in video_ids[offset:offset + limit]],
+                    len(video_ids))
+        video_ids = find()
+        return ResultPage(
+            self._page_in_title_order(video_ids, offset, limit, after),
+            len(video_ids))
+
+    def _page_in_title_order(self, video_ids, offset, limit, after=None):
+        """Returns one page of the Videos for a collection of ids, by title.
+
+        Only the first offset + limit matches are ever ordered: few matches
+        go through a bounded heap, many are read off the sorted title view,
+        which is walked only until the page is full.
+
+        Args:
+            video_ids: The ids of every match.
+            offset: How many matches to skip.
+            limit: The most Videos to return.
+            after: Optional (title, video_id) cursor; only matches ordered
+                after it are returned.
+        """
+        count = len(video_ids)
+        stop = offset + limit
+        if not count or not limit:
+            return []
+        start = 0 if after is None else bisect.bisect_right(
+            self._title_order, after)
+        walked = stop * (len(self._title_order) - start) / count
+        if count * math.log2(stop + 1) < walked:
+            keys = ((self._videos[video_id]._title, video_id)
+                    for video_id in video_ids)
+            if after is not None:
+                keys = (key for key in keys if key > after)
+            page = heapq.nsmallest(stop, keys)[offset:]
+        else:
+            if not isinstance(video_ids, (set, dict)):
+                video_ids = set(video_ids)
+            page = itertools.islice(
+                (key for key in itertools.islice(self._title_order, start,
+                                                 None)
+                 if key[1] in video_ids), offset, stop)
+        return [self._videos[video_id] for _, video_id in page]
+
+    def _index_video(self, video_id):
+        """Adds a video already in self._videos to the built indexes."""
+        legal = video_id not in self.flagged
+        if self._tag_index is not None:
+            video = self._videos[video_id]
+            self._title_index.add(video_id, video._title)
+            bisect.insort(self._title_order, (video._title, video_id))
+            if legal:
+                self._add_to_tag_index(video)
+        if self._legal_ids is not None and legal:
+            self._add_to_legal_pool(video_id)
+
+    def _unindex_video(self, video_id):
+        """Removes a video still in self._videos from the built indexes."""
+        legal = video_id not in self.flagged
+        if self._tag_index is not None:
+            video = self._videos[video_id]
+            self._title_index.remove(video_id)
+            position = bisect.bisect_left(self._title_order,
+                                          (video._title, video_id))
+            del self._title_order[position]
+            if legal:
+                self._remove_from_tag_index(video)
+        if self._legal_ids is not None and legal:
+            self._remove_from_legal_pool(video_id)
+
+    def _add_to_tag_index(self, video):
+        for tag in video._tags:
+            self._tag_index.setdefault(tag.upper(), set()).add(
+                video._video_id)
+
+    def _remove_from_tag_index(self, video):
+        for tag in video._tags:
+            video_ids = self._tag_index.get(tag.upper())
+            if video_ids is not None:
+                video_ids.discard(video._video_id)
+                if not video_ids:
+                    del self._tag_index[tag.upper()]
 
     def get_all_videos(self):
         """Returns all available video information from the video library."""
-        return list(self._videos.values())
+        with self._lock.read:
+            return list(self._videos.values())
+
+    def get_all_videos_by_title(self):
+        """Returns every video in the library, ordered by title."""
+        self._ensure_indexes()
+        with self._lock.read:
+            return [self._videos[video_id]
+                    for _, video_id in self._title_order]
 
     def get_legal_videos(self):
-        return [v for v in self.get_all_videos() if v._video_id not in self.flagged]
+        with self._lock.read:
+            return [v for v in self._videos.values()
+                    if v._video_id not in self.flagged]
 
     def get_video(self, video_id):
         """Returns the video object (title, url, tags) from the video library.
@@ -46,10 +359,308 @@ class VideoLibrary:
             The Video object for the requested video_id. None if the video
             does not exist.
         """
-        return self._videos.get(video_id, None)
+        with self._lock.read:
+            return self._videos.get(video_id, None)
+
+    def get_videos_with_tag(self, video_tag):
+        """Returns the legal videos carrying a tag, ignoring case.
+
+        Args:
+            video_tag: The tag to look up.
+
+        Returns:
+            A list of Video objects, ordered by title.
+        """
+        self._ensure_indexes()
+        video_tag = video_tag.upper()
+        with self._lock.read:
+            return [self._videos[video_id] for video_id in
+                    self._cached_search(
+                        ("TAG", video_tag),
+                        lambda: self._tag_index.get(video_tag, ()))]
+
+    def get_videos_with_tag_page(self, video_tag, limit, offset=0,
+                                 after=None):
+        """Returns one page of the legal videos carrying a tag.
+
+        Args:
+            video_tag: The tag to look up, ignoring case.
+            limit: The most videos on the page.
+            offset: How many videos, in title order, precede the page.
+            after: Optional (title, video_id) of the last video on the
+                previous page, to continue from instead of an offset.
+
+        Returns:
+            A ResultPage of Video objects, ordered by title.
+        """
+        self._ensure_indexes()
+        video_tag = video_tag.upper()
+        with self._lock.read:
+            return self._cached_page(
+                ("TAG", video_tag),
+                lambda: self._tag_index.get(video_tag, ()),
+                offset, limit, after)
+
+    def get_random_legal_video(self):
+        """Returns a random legal video, or None if every video is flagged."""
+        self._ensure_legal_pool()
+        with self._lock.read:
+            if not self._legal_ids:
+                return None
+            return self._videos[random.choice(self._legal_ids)]
+
+    def search_titles(self, search_term):
+        """Returns the legal videos whose titles contain a term, ignoring case.
+
+        Args:
+            search_term: The substring to look for.
+
+        Returns:
+            A list of Video objects, ordered by title.
+        """
+        self._ensure_indexes()
+        with self._lock.read:
+            return [self._videos[video_id] for video_id in
+                    self._cached_search(
+                        ("TITLE", search_term.upper()),
+                        lambda: self._title_matches(search_term))]
+
+    def search_titles_page(self, search_term, limit, offset=0, after=None):
+        """Returns one page of the legal videos whose titles contain a term.
+
+        Args:
+            search_term: The substring to look for, ignoring case.
+            limit: The most videos on the page.
+            offset: How many videos, in title order, precede the page.
+            after: Optional (title, video_id) of the last video on the
+                previous page, to continue from instead of an offset.
+
+        Returns:
+            A ResultPage of Video objects, ordered by title.
+        """
+        self._ensure_indexes()
+        with self._lock.read:
+            return self._cached_page(
+                ("TITLE", search_term.upper()),
+                lambda: self._title_matches(search_term),
+                offset, limit, after)
+
+    def add_video(self, video):
+        """Adds a new video to the library and its indexes.
+
+        Args:
+            video: The Video to add; its video_id must not be in use.
+        """
+        with self._lock.write:
+            if video._video_id in self._videos:
+                raise ValueError(f"Video already exists: {video._video_id}")
+            self._videos[video._video_id] = video
+            self._absent_flags.discard(video._video_id)
+            self._index_video(video._video_id)
+            self._modifications += 1
+            self._generation += 1
+
+    def remove_video(self, video_id):
+        """Removes a video from the library.
+
+        A flag on the video is kept, and applies again if the video is
+        added back. Registered removal listeners are told about the removed
+        video.
+
+        Args:
+            video_id: The id of an existing video.
+        """
+        with self._lock.write:
+            self._unindex_video(video_id)
+            del self._videos[video_id]
+            if video_id in self.flagged:
+                self._absent_flags.add(video_id)
+            self._modifications += 1
+            self._generation += 1
+        self._notify(self._removal_listeners, [video_id])
+
+    def add_removal_listener(self, callback):
+        """Registers a callback for videos leaving the library.
+
+        Args:
+            callback: Called with a list of removed video ids. Bound methods
+                are held weakly, so a listening VideoPlayer can still be
+                garbage collected.
+        """
+        self._add_listener(self._removal_listeners, callback)
+
+    def add_flag_listener(self, callback):
+        """Registers a callback for videos being flagged.
+
+        Args:
+            callback: Called with a list of newly flagged video ids, held
+                as in add_removal_listener.
+        """
+        self._add_listener(self._flag_listeners, callback)
+
+    def _add_listener(self, listeners, callback):
+        if hasattr(callback, "__self__"):
+            reference = weakref.WeakMethod(callback)
+        else:
+            def reference():
+                return callback
+        with self._listeners_lock:
+            listeners[:] = [listener for listener in listeners
+                            if listener() is not None]
+            listeners.append(reference)
+
+    def _notify(self, listeners, video_ids):
+        if not video_ids:
+            return
+        with self._listeners_lock:
+            callbacks = [listener() for listener in listeners]
+        for callback in callbacks:
+            if callback is not None:
+                callback(video_ids)
+
+    def get_source_state(self):
+        """Returns the catalog file's (mtime in ns, size in bytes)."""
+        return self._stat_source()
+
+    def has_source_changed(self):
+        """Returns True if the catalog file changed since it was loaded."""
+        return self._stat_source() != self._source_state
+
+    def reload(self):
+        """Reloads the catalog file, applying only what changed.
+
+        The new file is read without holding the lock and compared with
+        the loaded catalog under a read hold, so commands keep running
+        meanwhile. Only then are the added, removed and changed videos
+        applied to the catalog and every built index, under a short write
+        hold. Flags are kept, including those of removed videos, which
+        apply again if the videos come back. A replaced lazy or snapshot
+        catalog is closed.
+
+        Returns:
+            A CatalogChanges tuple of video id lists.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            source_state = self._stat_source()
+            videos = self._open_catalog()
+            with self._lock.read:
+                modifications = self._modifications
+                changes = self._compare(videos)
+            with self._lock.write:
+                if modifications != self._modifications:
+                    changes = self._compare(videos)
+                old_videos = self._videos
+                self._apply(videos, changes)
+                self._source_state = source_state
+                self.reload_count += 1
+                self.last_reload_seconds = time.perf_counter() - start
+            # No reader can still be using the replaced catalog.
+            if hasattr(old_videos, "close"):
+                old_videos.close()
+        self._notify(self._removal_listeners, changes.removed)
+        return changes
+
+    def _compare(self, videos):
+        """Returns the CatalogChanges from the loaded catalog to videos."""
+        old_ids = set(self._videos)
+        new_ids = set(videos)
+        added = [video_id for video_id in videos if video_id not in old_ids]
+        removed = [video_id for video_id in self._videos
+                   if video_id not in new_ids]
+        changed = []
+        for video_id in old_ids & new_ids:
+            old, new = self._videos[video_id], videos[video_id]
+            if old._title != new._title or old._tags != new._tags:
+                changed.append(video_id)
+        return CatalogChanges(added, removed, changed)
+
+    def _apply(self, videos, changes):
+        """Replaces the catalog with videos, updating the built indexes."""
+        added, removed, changed = changes
+        for video_id in removed + changed:
+            self._unindex_video(video_id)
+        self._videos = videos
+        for video_id in removed:
+            if video_id in self.flagged:
+                self._absent_flags.add(video_id)
+        for video_id in added:
+            self._absent_flags.discard(video_id)
+        for video_id in changed + added:
+            self._index_video(video_id)
+        if added or removed or changed:
+            self._generation += 1
+
+    def reload_if_changed(self):
+        """Reloads the catalog file if it changed since it was loaded.
+
+        Returns:
+            A CatalogChanges tuple, or None if the file is unchanged.
+        """
+        if not self.has_source_changed():
+            return None
+        return self.reload()
+
+    def flag_video(self, video_id, flag_reason):
+        """Marks a video as flagged, hiding it from searches.
+
+        Registered flag listeners are told about the flagged video.
+
+        Args:
+            video_id: The id of an existing video.
+            flag_reason: Reason for flagging the video.
+
+        Returns:
+            False if the video was already flagged, True otherwise.
+        """
+        with self._lock.write:
+            if video_id in self.flagged:
+                return False
+            if self._flag_store is not None:
+                self._flag_store.flag(video_id, flag_reason)
+            self.flagged[video_id] = flag_reason
+            if self._tag_index is not None:
+                self._remove_from_tag_index(self._videos[video_id])
+            if self._legal_ids is not None:
+                self._remove_from_legal_pool(video_id)
+            self._generation += 1
+        self._notify(self._flag_listeners, [video_id])
+        return True
+
+    def allow_video(self, video_id):
+        """Removes the flag from a video.
+
+        Args:
+            video_id: The id of an existing video.
+
+        Returns:
+            False if the video was not flagged, True otherwise.
+        """
+        with self._lock.write:
+            if video_id not in self.flagged:
+                return False
+            if self._flag_store is not None:
+                self._flag_store.allow(video_id)
+            self.flagged.pop(video_id)
+            if self._tag_index is not None:
+                self._add_to_tag_index(self._videos[video_id])
+            if self._legal_ids is not None:
+                self._add_to_legal_pool(video_id)
+            self._generation += 1
+            return True
 
     def get_number_of_videos(self):
-        return len(self.get_all_videos())
+        with self._lock.read:
+            return len(self._videos)
 
     def get_number_of_legal_videos(self):
-        return self.get_number_of_videos()-len(self.flagged)
+        with self._lock.read:
+            return len(self._videos) - self._count_flagged()
+
+    def get_number_of_flagged_videos(self):
+        """Returns the number of flagged videos in the catalog."""
+        with self._lock.read:
+            return self._count_flagged()
+
+    def _count_flagged(self):
+        return len(self.flagged) - len(self._absent_flags)
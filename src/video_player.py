@@ -2,7 +2,10 @@
 
 from .video_library import VideoLibrary
 from .video_playlist import Playlist
-import random
+from .playlist_store import PlaylistStore
+from .output_sink import StdoutSink
+import functools
+import threading
 
 
 class VideoException(Exception):
@@ -19,43 +22,159 @@ class PlaylistException(Exception):
         super().__init__(f"Cannot {self.command} {name}: {message}")
 
 
+# Results per page when SEARCH_VIDEOS is given PAGE without LIMIT.
+DEFAULT_PAGE_SIZE = 10
+
+
+def _applying_library_changes(command):
+    """Applies queued library changes before running a player command."""
+    @functools.wraps(command)
+    def run(self, *args, **kwargs):
+        if self._library_changes:
+            self._apply_library_changes()
+        return command(self, *args, **kwargs)
+    return run
+
+
 class VideoPlayer:
     """A class used to represent a Video Player."""
 
-    def __init__(self):
-        self._video_library = VideoLibrary()
+    def __init__(self, video_library=None, playlist_store=None,
+                 read_answer=None, sink=None):
+        """The VideoPlayer class is initialized.
+
+        Args:
+            video_library: The VideoLibrary to play from. Sessions given the
+                same library (see VideoLibrary.shared) share its catalog and
+                flags, while playback state and playlists stay per player.
+                A private library is loaded if omitted.
+            playlist_store: Optional PlaylistStore that playlists are loaded
+                from and every playlist change is written through to.
+            read_answer: Optional callable returning the user's answer to
+                the "play any of the above?" search prompt. Defaults to
+                reading a line with input(). If it returns None, the prompt
+                stays open until answer_search is called.
+            sink: The OutputSink that output lines are written to. Defaults
+                to printing them on stdout.
+        """
+        if video_library is None:
+            video_library = VideoLibrary()
+        self._video_library = video_library
+        self._video_library.add_removal_listener(self._videos_removed)
+        self._video_library.add_flag_listener(self._videos_flagged)
+        self._playlist_store = playlist_store or PlaylistStore()
+        self._read_answer = read_answer
+        self._pending_results = None
+        self.sink = sink or StdoutSink()
         self.playing_id = ""
+        self._playing_video = None
         self.paused = False
+        # Lists of removed or flagged video ids queued by the library
+        # listeners, which run on other sessions' threads; applied before
+        # the next command.
+        self._library_changes = []
+        self._library_changes_lock = threading.Lock()
         self.playlists = {}
+        # video_id -> keys of the playlists containing it.
+        self._video_playlists = {}
+        self._playlist_entries = 0
+        # Entries for videos missing from the library are kept, hidden,
+        # so they come back with the video.
+        for key, (name, video_ids) in self._playlist_store.load().items():
+            self.playlists[key] = Playlist(name)
+            for video_id in video_ids:
+                if video_id not in self.playlists[key]:
+                    self.playlists[key].add(video_id)
+                    self._track_entry(key, video_id)
+
+    def _track_entry(self, key, video_id):
+        self._video_playlists.setdefault(video_id, set()).add(key)
+        self._playlist_entries += 1
+
+    def _untrack_entry(self, key, video_id):
+        keys = self._video_playlists[video_id]
+        keys.discard(key)
+        self._playlist_entries -= 1
+        if not keys:
+            del self._video_playlists[video_id]
+
+    def _untrack_playlist(self, key):
+        for video_id in self.playlists[key]:
+            self._untrack_entry(key, video_id)
+
+    @_applying_library_changes
+    def get_playlists_with_video(self, video_id):
+        """Returns the names of the playlists containing a video.
+
+        Args:
+            video_id: The video_id to look up.
+
+        Returns:
+            A list of playlist names, sorted like SHOW_ALL_PLAYLISTS.
+        """
+        return [self.playlists[key]._name
+                for key in sorted(self._video_playlists.get(video_id, ()))]
+
+    def get_number_of_playlist_entries(self):
+        """Returns the total number of videos across all playlists."""
+        return self._playlist_entries
+
+    def _videos_removed(self, video_ids):
+        """Queues videos that were removed from the library.
+
+        Their playlist entries are only hidden, so a video that comes
+        back with a later reload reappears in its playlists.
+        """
+        with self._library_changes_lock:
+            self._library_changes.append(video_ids)
+
+    def _videos_flagged(self, video_ids):
+        """Queues videos that were flagged, possibly by another session."""
+        with self._library_changes_lock:
+            self._library_changes.append(video_ids)
+
+    def _apply_library_changes(self):
+        """Stops playing a video that was removed or flagged."""
+        with self._library_changes_lock:
+            changes, self._library_changes = self._library_changes, []
+        for video_ids in changes:
+            if self.playing_id in video_ids:
+                self._set_playing(None)
+
+    def _set_playing(self, video):
+        self._playing_video = video
+        self.playing_id = video._video_id if video is not None else ""
+        self.paused = False
 
     def get_current_title(self):
-        return self.get_title(self.playing_id)
+        return self._playing_video._title
 
     def get_title(self, video_id):
         return self._video_library.get_video(video_id)._title
 
+    @_applying_library_changes
     def number_of_videos(self):
         num = self._video_library.get_number_of_videos()
-        print(f"{num} videos in the library")
+        self.sink.write(f"{num} videos in the library")
 
+    @_applying_library_changes
     def show_all_videos(self):
         """Returns all videos."""
-        print("Here's a list of all available videos:")
-
-        def index(x):
-            return x._title
-        for video in sorted(self._video_library.get_all_videos(), key=index):
+        lines = ["Here's a list of all available videos:"]
+        for video in self._video_library.get_all_videos_by_title():
             tags = ""
             for tag in video._tags:
                 tags += f"{tag} "
             if tags != "":
                 tags = tags[:-1]
             msg = ""
-            if video._video_id in self._video_library.flagged:
-                reason = self._video_library.flagged[video._video_id]
+            reason = self._video_library.flagged.get(video._video_id)
+            if reason is not None:
                 msg = f" - FLAGGED (reason: {reason})"
-            print(f"\t{video._title} ({video._video_id}) [{tags}]{msg}")
+            lines.append(f"\t{video._title} ({video._video_id}) [{tags}]{msg}")
+        self.sink.write_lines(lines)
 
+    @_applying_library_changes
     def play_video(self, video_id):
         """Plays the respective video.
 
@@ -66,53 +185,59 @@ class VideoPlayer:
         try:
             if video is None:
                 raise VideoException("play", "Video does not exist")
-            if video_id in self._video_library.flagged.keys():
-                reason = self._video_library.flagged[video_id]
+            reason = self._video_library.flagged.get(video_id)
+            if reason is not None:
                 raise VideoException("play", f"Video is currently "
                                      f"flagged (reason: {reason})")
             else:
                 if self.playing_id != "":
-                    self.stop_video()
-                self.playing_id = video_id
-                self.paused = False
-                print(f"Playing video: {self.get_current_title()}")
+                    self._stop_video()
+                self._set_playing(video)
+                self.sink.write(f"Playing video: {self.get_current_title()}")
         except VideoException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def stop_video(self):
         """Stops the current video."""
+        self._stop_video()
+
+    def _stop_video(self):
         try:
             if self.playing_id != "":
                 title = self.get_current_title()
-                self.playing_id = ""
-                print(f"Stopping video: {title}")
+                self._set_playing(None)
+                self.sink.write(f"Stopping video: {title}")
             else:
                 raise VideoException("stop", "No video is currently playing")
         except VideoException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def play_random_video(self):
         """Plays a random video from the video library."""
-        num = self._video_library.get_number_of_legal_videos()
-        if num == 0:
-            print("No videos available")
+        video = self._video_library.get_random_legal_video()
+        if video is None:
+            self.sink.write("No videos available")
             return
-        rand = random.randrange(num)
-        self.play_video(self._video_library.get_legal_videos()[rand]._video_id)
+        self.play_video(video._video_id)
 
+    @_applying_library_changes
     def pause_video(self):
         """Pauses the current video."""
         try:
             if self.playing_id == "":
                 raise VideoException("pause", "No video is currently playing")
             if self.paused:
-                print(f"Video already paused: {self.get_current_title()}")
+                self.sink.write(
+                    f"Video already paused: {self.get_current_title()}")
             else:
                 self.paused = True
-                print(f"Pausing video: {self.get_current_title()}")
+                self.sink.write(f"Pausing video: {self.get_current_title()}")
         except VideoException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def continue_video(self):
         """Resumes playing the current video."""
         try:
@@ -122,16 +247,17 @@ class VideoPlayer:
             if self.paused is False:
                 raise VideoException("continue", "Video is not paused")
             self.paused = False
-            print(f"Continuing video: {self.get_current_title()}")
+            self.sink.write(f"Continuing video: {self.get_current_title()}")
         except VideoException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def show_playing(self):
         """Displays video currently playing."""
         if self.playing_id == "":
-            print("No video is currently playing")
+            self.sink.write("No video is currently playing")
             return
-        video = self._video_library.get_video(self.playing_id)
+        video = self._playing_video
         tags = ""
         for tag in video._tags:
             tags += f"{tag} "
@@ -141,21 +267,27 @@ class VideoPlayer:
             f"Currently playing: {video._title} ({video._video_id}) [{tags}]"
         if self.paused:
             message += " - PAUSED"
-        print(message)
+        reason = self._video_library.flagged.get(video._video_id)
+        if reason is not None:
+            message += f" - FLAGGED (reason: {reason})"
+        self.sink.write(message)
 
     def show_video(self, video_id):
         video = self._video_library.get_video(video_id)
+        if video is None:
+            return None
         tags = ""
         for tag in video._tags:
             tags += f"{tag} "
         if tags != "":
             tags = tags[:-1]
         msg = ""
-        if video_id in self._video_library.flagged:
-            reason = self._video_library.flagged[video_id]
+        reason = self._video_library.flagged.get(video_id)
+        if reason is not None:
             msg = f" - FLAGGED (reason: {reason})"
         return f"{video._title} ({video_id}) [{tags}]{msg}"
 
+    @_applying_library_changes
     def create_playlist(self, playlist_name):
         """Creates a playlist with a given name.
 
@@ -167,10 +299,13 @@ class VideoPlayer:
                 raise PlaylistException(
                     "create", "A playlist with the same name already exists")
             self.playlists[playlist_name.upper()] = Playlist(playlist_name)
-            print(f"Successfully created new playlist: {playlist_name}")
+            self._playlist_store.create(playlist_name.upper(), playlist_name)
+            self.sink.write(
+                f"Successfully created new playlist: {playlist_name}")
         except PlaylistException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def add_to_playlist(self, playlist_name, video_id):
         """Adds a video to a playlist with a given name.
 
@@ -187,31 +322,36 @@ class VideoPlayer:
                 raise PlaylistException(
                     "add video to", "Video does not exist",
                     name=playlist_name)
-            if video_id in self._video_library.flagged:
-                reason = self._video_library.flagged[video_id]
+            reason = self._video_library.flagged.get(video_id)
+            if reason is not None:
                 raise PlaylistException(
                     "add video to",
                     f"Video is currently flagged (reason: {reason})",
                     name=playlist_name)
-            if video_id in self.playlists.get(playlist_name.upper()).videos:
+            if video_id in self.playlists.get(playlist_name.upper()):
                 raise PlaylistException(
                     "add video to", "Video already added",
                     name=playlist_name)
-            self.playlists.get(playlist_name.upper()).videos.append(video_id)
+            self.playlists.get(playlist_name.upper()).add(video_id)
+            self._track_entry(playlist_name.upper(), video_id)
+            self._playlist_store.add(playlist_name.upper(), video_id)
             title = self.get_title(video_id)
-            print(f"Added video to {playlist_name}: {title}")
+            self.sink.write(f"Added video to {playlist_name}: {title}")
         except PlaylistException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def show_all_playlists(self):
         """Display all playlists."""
         if not self.playlists:
-            print("No playlists exist yet")
+            self.sink.write("No playlists exist yet")
             return
-        print("Showing all playlists:")
+        lines = ["Showing all playlists:"]
         for elem in sorted(self.playlists.keys()):
-            print(f"\t{self.playlists.get(elem)._name}")
+            lines.append(f"\t{self.playlists.get(elem)._name}")
+        self.sink.write_lines(lines)
 
+    @_applying_library_changes
     def show_playlist(self, playlist_name):
         """Display all videos in a playlist with a given name.
 
@@ -223,16 +363,20 @@ class VideoPlayer:
                 raise PlaylistException(
                     "show playlist", "Playlist does not exist",
                     name=playlist_name)
-            print(f"Showing playlist: {playlist_name}")
-            p = self.playlists.get(playlist_name.upper())
-            if len(p.videos) == 0:
-                print("\tNo videos here yet")
+            self.sink.write(f"Showing playlist: {playlist_name}")
+            lines = []
+            for video_id in self.playlists.get(playlist_name.upper()):
+                line = self.show_video(video_id)
+                if line is not None:
+                    lines.append(f"\t{line}")
+            if not lines:
+                self.sink.write("\tNo videos here yet")
             else:
-                for v in p.videos:
-                    print(f"\t{self.show_video(v)}")
+                self.sink.write_lines(lines)
         except PlaylistException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def remove_from_playlist(self, playlist_name, video_id):
         """Removes a video to a playlist with a given name.
 
@@ -250,16 +394,19 @@ class VideoPlayer:
                     "remove video from", "Video does not exist",
                     name=playlist_name)
             p = self.playlists.get(playlist_name.upper())
-            if video_id not in p.videos:
+            if video_id not in p:
                 raise PlaylistException(
                     "remove video from", "Video is not in playlist",
                     name=playlist_name)
-            p.videos.remove(video_id)
-            print(f"Removed video from {playlist_name}: "
-                  f"{self.get_title(video_id)}")
+            p.remove(video_id)
+            self._untrack_entry(playlist_name.upper(), video_id)
+            self._playlist_store.remove(playlist_name.upper(), video_id)
+            self.sink.write(f"Removed video from {playlist_name}: "
+                            f"{self.get_title(video_id)}")
         except PlaylistException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def clear_playlist(self, playlist_name):
         """Removes all videos from a playlist with a given name.
 
@@ -271,12 +418,16 @@ class VideoPlayer:
                 raise PlaylistException(
                     "clear playlist", "Playlist does not exist",
                     name=playlist_name)
+            self._untrack_playlist(playlist_name.upper())
             p = self.playlists.get(playlist_name.upper())
-            p.videos.clear()
-            print(f"Successfully removed all videos from {playlist_name}")
+            p.clear()
+            self._playlist_store.clear(playlist_name.upper())
+            self.sink.write(
+                f"Successfully removed all videos from {playlist_name}")
         except PlaylistException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def delete_playlist(self, playlist_name):
         """Deletes a playlist with a given name.
 
@@ -288,74 +439,145 @@ class VideoPlayer:
                 raise PlaylistException(
                     "delete playlist", "Playlist does not exist",
                     name=playlist_name)
-            p = self.playlists.get(playlist_name.upper())
-            p.videos.clear()
-            print(f"Deleted playlist: {playlist_name}")
+            self._untrack_playlist(playlist_name.upper())
+            del self.playlists[playlist_name.upper()]
+            self._playlist_store.delete(playlist_name.upper())
+            self.sink.write(f"Deleted playlist: {playlist_name}")
         except PlaylistException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
-    def search_videos(self, search_term):
+    @_applying_library_changes
+    def search_videos(self, search_term, *options):
         """Display all the videos whose titles contain the search_term.
 
         Args:
             search_term: The query to be used in search.
+            options: Optional "LIMIT", n and "PAGE", k words, to show only
+                the k-th page of n results.
         """
-        results = [v for v in self._video_library.get_legal_videos()
-                   if search_term.upper() in v._title.upper()]
-        if not results:
-            print(f"No search results for {search_term}")
-            return
-
-        def index(x):
-            return x._title
-        results = sorted(results, key=index)
-        print(f"Here are the results for {search_term}:")
-        for count, video in enumerate(results):
-            print(f"\t{count+1}) {self.show_video(video._video_id)}")
-        print("Would you like to play any of the above? If yes, "
-              "specify the number of the video.")
-        print("If your answer is not a valid number, "
-              "we will assume it's a no.")
-        num = input()
-        try:
-            num = int(num)
-        except ValueError:
-            return
-        num = num-1
-        if num >= 0 and num < len(results):
-            self.play_video(results[num]._video_id)
-
-    def search_videos_tag(self, video_tag):
+        page = self._parse_page_options(options)
+        if page is None:
+            results = self._video_library.search_titles(search_term)
+            self._offer_search_results(search_term, results)
+        elif page:
+            limit, number = page
+            results = self._video_library.search_titles_page(
+                search_term, limit, (number - 1) * limit)
+            self._offer_search_results(search_term, results.videos,
+                                       (number - 1) * limit, results.total)
+
+    @_applying_library_changes
+    def search_videos_tag(self, video_tag, *options):
         """Display all videos whose tags contains the provided tag.
 
         Args:
             video_tag: The video tag to be used in search.
+            options: Optional "LIMIT", n and "PAGE", k words, to show only
+                the k-th page of n results.
+        """
+        page = self._parse_page_options(options)
+        if page is None:
+            results = self._video_library.get_videos_with_tag(video_tag)
+            self._offer_search_results(video_tag, results)
+        elif page:
+            limit, number = page
+            results = self._video_library.get_videos_with_tag_page(
+                video_tag, limit, (number - 1) * limit)
+            self._offer_search_results(video_tag, results.videos,
+                                       (number - 1) * limit, results.total)
+
+    def _parse_page_options(self, options):
+        """Parses LIMIT and PAGE search options.
+
+        Returns:
+            None if there are no options, a (limit, page number) tuple, or
+            an empty tuple after reporting invalid options.
+        """
+        if not options:
+            return None
+        values = {}
+        for name, value in zip(options[::2], options[1::2]):
+            name = name.upper()
+            if name not in ("LIMIT", "PAGE") or name in values or \
+                    not value.isdecimal() or int(value) < 1:
+                break
+            values[name] = int(value)
+        else:
+            if len(options) % 2 == 0:
+                return (values.get("LIMIT", DEFAULT_PAGE_SIZE),
+                        values.get("PAGE", 1))
+        self.sink.write("Cannot search videos: Please give LIMIT and PAGE "
+                        "followed by positive numbers")
+        return ()
+
+    def _offer_search_results(self, query, results, offset=None, total=None):
+        """Lists search results and plays the one the user picks.
+
+        Args:
+            query: The search term or tag, as the user typed it.
+            results: The matching Video objects, in display order.
+            offset: If results is a page, the number of results before it.
+            total: If results is a page, the number of results on all pages.
         """
-        results = [v for v in self._video_library.get_legal_videos()
-                   if video_tag.upper() in [t.upper() for t in v._tags]]
         if not results:
-            print(f"No search results for {video_tag}")
+            if total:
+                self.sink.write(f"No search results for {query} on this "
+                                f"page, there are {total} in total")
+            else:
+                self.sink.write(f"No search results for {query}")
             return
 
-        def index(x):
-            return x._title
-        results = sorted(results, key=index)
-        print(f"Here are the results for {video_tag}:")
-        for count, video in enumerate(results):
-            print(f"\t{count+1}) {self.show_video(video._video_id)}")
-        print("Would you like to play any of the above? If yes, "
-              "specify the number of the video.")
-        print("If your answer is not a valid number, "
-              "we will assume it's a no.")
-        num = input()
+        if offset is None:
+            offset = 0
+            lines = [f"Here are the results for {query}:"]
+        else:
+            lines = [f"Here are the results for {query} ({offset + 1}-"
+                     f"{offset + len(results)} of {total}):"]
+        for count, video in enumerate(results, offset):
+            lines.append(f"\t{count+1}) {self.show_video(video._video_id)}")
+        lines.append("Would you like to play any of the above? If yes, "
+                     "specify the number of the video.")
+        lines.append("If your answer is not a valid number, "
+                     "we will assume it's a no.")
+        self.sink.write_lines(lines)
+        video_ids = [video._video_id for video in results]
+        if self._read_answer is None:
+            # The user has to see the prompt before answering it.
+            self.sink.flush()
+            num = input()
+        else:
+            num = self._read_answer()
+        if num is None:
+            self._pending_results = (video_ids, offset)
+            return
+        self._play_search_result(video_ids, offset, num)
+
+    def _play_search_result(self, video_ids, offset, num):
         try:
             num = int(num)
         except ValueError:
             return
-        num = num-1
-        if num >= 0 and num < len(results):
-            self.play_video(results[num]._video_id)
+        num = num-1-offset
+        if num >= 0 and num < len(video_ids):
+            self.play_video(video_ids[num])
+
+    @property
+    def awaiting_answer(self):
+        """Returns True if a search prompt is waiting for answer_search."""
+        return self._pending_results is not None
 
+    @_applying_library_changes
+    def answer_search(self, answer):
+        """Answers a search prompt that read_answer deferred.
+
+        Args:
+            answer: The user's answer, a result number to play it.
+        """
+        pending, self._pending_results = self._pending_results, None
+        if pending is not None:
+            self._play_search_result(*pending, answer)
+
+    @_applying_library_changes
     def flag_video(self, video_id, flag_reason=""):
         """Mark a video as flagged.
 
@@ -367,19 +589,21 @@ class VideoPlayer:
             if self._video_library.get_video(video_id) is None:
                 raise VideoException(
                     "flag", "Video does not exist")
-            if video_id in self._video_library.flagged.keys():
-                raise VideoException(
-                    "flag", "Video is already flagged")
             if flag_reason == "":
                 flag_reason = "Not supplied"
-            self._video_library.flagged[video_id] = flag_reason
+            if not self._video_library.flag_video(video_id, flag_reason):
+                raise VideoException(
+                    "flag", "Video is already flagged")
+            # Other sessions stop the video before their next command.
             if video_id == self.playing_id:
-                self.stop_video()
-            print(f"Successfully flagged video: {self.get_title(video_id)} "
-                  f"(reason: {flag_reason})")
+                self._stop_video()
+            self.sink.write(f"Successfully flagged video: "
+                            f"{self.get_title(video_id)} "
+                            f"(reason: {flag_reason})")
         except VideoException as e:
-            print(e.message)
+            self.sink.write(e.message)
 
+    @_applying_library_changes
     def allow_video(self, video_id):
         """Removes a flag from a video.
 
@@ -390,11 +614,10 @@ class VideoPlayer:
             if self._video_library.get_video(video_id) is None:
                 raise VideoException(
                     "remove flag from", "Video does not exist")
-            if video_id not in self._video_library.flagged.keys():
+            if not self._video_library.allow_video(video_id):
                 raise VideoException(
                     "remove flag from", "Video is not flagged")
-            self._video_library.flagged.pop(video_id)
-            print(f"Successfully removed flag from video: "
-                  f"{self.get_title(video_id)}")
+            self.sink.write(f"Successfully removed flag from video: "
+                            f"{self.get_title(video_id)}")
         except VideoException as e:
-            print(e.message)
+            self.sink.write(e.message)
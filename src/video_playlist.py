@@ -5,4 +5,36 @@ class Playlist:
     """A class used to represent a Playlist."""
     def __init__(self, name):
         self._name = name
-        self.videos = []
+        # A dict used as an insertion-ordered set of video ids, so
+        # membership, appends and removals are O(1).
+        self._videos = {}
+
+    @property
+    def videos(self):
+        """Returns a read-only view of the video ids, in the order added."""
+        return self._videos.keys()
+
+    def add(self, video_id):
+        """Appends a video id that is not in the playlist yet."""
+        self._videos[video_id] = None
+
+    def extend(self, video_ids):
+        """Appends several video ids that are not in the playlist yet."""
+        self._videos.update(dict.fromkeys(video_ids))
+
+    def remove(self, video_id):
+        """Removes a video id that is in the playlist."""
+        del self._videos[video_id]
+
+    def clear(self):
+        """Removes every video id."""
+        self._videos.clear()
+
+    def __contains__(self, video_id):
+        return video_id in self._videos
+
+    def __iter__(self):
+        return iter(self._videos)
+
+    def __len__(self):
+        return len(self._videos)
@@ -0,0 +1,48 @@
+import io
+
+from src.run import run_batch
+
+
+def test_batch_answers_prompts_from_the_stream():
+    output = io.StringIO()
+    executed = run_batch(io.StringIO(
+        "SEARCH_VIDEOS cat\n"
+        "2\n"
+        "\n"
+        "SHOW_PLAYING\n"
+        "BOGUS\n"
+        "PLAY\n"
+        "EXIT\n"
+        "NUMBER_OF_VIDEOS\n"), output)
+    lines = output.getvalue().splitlines()
+
+    assert executed == 4
+    assert len(lines) == 9
+    assert "Here are the results for cat:" in lines[0]
+    assert "Playing video: Another Cat Video" in lines[5]
+    assert "Currently playing: Another Cat Video" in lines[6]
+    assert "Please enter a valid command" in lines[7]
+    assert "Please enter PLAY command followed by video_id." in lines[8]
+
+
+def test_batch_uses_fixed_answer():
+    output = io.StringIO()
+    run_batch(["SEARCH_VIDEOS_WITH_TAG #dog", "SHOW_PLAYING"], output,
+              answer="1")
+    lines = output.getvalue().splitlines()
+    assert "Playing video: Funny Dogs" in lines[4]
+    assert "Currently playing: Funny Dogs" in lines[5]
+
+
+def test_batch_searches_do_not_flush_the_output():
+    class CountingStream(io.StringIO):
+        flushes = 0
+
+        def flush(self):
+            self.flushes += 1
+            super().flush()
+
+    output = CountingStream()
+    run_batch(["SEARCH_VIDEOS cat", "1"] * 50, output)
+    assert output.getvalue().count("Playing video: Amazing Cats") == 50
+    assert output.flushes == 1
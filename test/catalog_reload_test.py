@@ -0,0 +1,134 @@
+import os
+
+from src.catalog_watcher import CatalogWatcher
+from src.flag_store import FlagStore
+from src.playlist_store import SqlitePlaylistStore
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _write(catalog, text, mtime):
+    catalog.write_text(text)
+    os.utime(catalog, ns=(mtime, mtime))
+
+
+def test_reload_applies_only_changes(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    _write(catalog, "Cats | cats_id | #cat\n"
+                    "Dogs | dogs_id | #dog\n"
+                    "Fish | fish_id | #fish\n", 1)
+    library = VideoLibrary(catalog)
+    library.flag_video("cats_id", "dont_like_cats")
+    assert library.reload_if_changed() is None
+
+    _write(catalog, "Cats | cats_id | #cat\n"
+                    "Hounds | dogs_id | #dog , #hound\n"
+                    "Birds | birds_id | #bird\n", 2)
+    changes = library.reload_if_changed()
+
+    assert changes.added == ["birds_id"]
+    assert changes.removed == ["fish_id"]
+    assert changes.changed == ["dogs_id"]
+    assert library.flagged == {"cats_id": "dont_like_cats"}
+    assert [v.title for v in library.get_all_videos_by_title()] == [
+        "Birds", "Cats", "Hounds"]
+    assert [v.title for v in library.search_titles("ound")] == ["Hounds"]
+    assert library.get_videos_with_tag("#fish") == []
+    assert library.get_videos_with_tag("#cat") == []
+    assert library.get_number_of_legal_videos() == 2
+
+
+def test_reload_hides_removed_videos_in_players(tmp_path, capfd):
+    catalog = tmp_path / "videos.txt"
+    _write(catalog, "Cats | cats_id | #cat\nDogs | dogs_id | #dog\n", 1)
+    library = VideoLibrary(catalog, lazy=True)
+    player = VideoPlayer(library)
+    player.create_playlist("pets")
+    player.add_to_playlist("pets", "cats_id")
+    player.add_to_playlist("pets", "dogs_id")
+    player.play_video("cats_id")
+
+    _write(catalog, "Dogs | dogs_id | #dog\n", 2)
+    watcher = CatalogWatcher(library)
+    assert watcher.check() is None
+    changes = watcher.check()
+    assert changes.removed == ["cats_id"]
+    capfd.readouterr()
+
+    player.show_playing()
+    player.show_playlist("pets")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 3
+    assert "No video is currently playing" in lines[0]
+    assert "Dogs (dogs_id) [#dog]" in lines[2]
+    assert library.get_number_of_videos() == 1
+
+
+def test_lazy_reload_reports_changes_and_closes_old_catalog(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    _write(catalog, "Cats | cats_id | #cat\nDogs | dogs_id | #dog\n", 1)
+    library = VideoLibrary(catalog, lazy=True)
+    old_videos = library._videos
+
+    _write(catalog, "Cats | cats_id | #cat\nHounds | dogs_id | #dog\n", 2)
+    changes = library.reload()
+
+    assert changes.changed == ["dogs_id"]
+    assert old_videos._file.closed
+    assert library.get_video("dogs_id").title == "Hounds"
+
+
+def test_dead_listeners_are_pruned_on_registration():
+    library = VideoLibrary()
+    for _ in range(10):
+        VideoPlayer(library)
+    VideoPlayer(library)
+    assert len(library._removal_listeners) <= 2
+
+
+def test_truncated_catalog_keeps_flags_and_playlists(tmp_path, capfd):
+    catalog = tmp_path / "videos.txt"
+    full = "Cats | cats_id | #cat\nDogs | dogs_id | #dog\n"
+    _write(catalog, full, 1)
+    flag_store = FlagStore(tmp_path / "flags.log")
+    playlist_store = SqlitePlaylistStore(tmp_path / "playlists.db")
+    library = VideoLibrary(catalog, flag_store=flag_store)
+    player = VideoPlayer(library, playlist_store)
+    player.create_playlist("pets")
+    player.add_to_playlist("pets", "dogs_id")
+    player.flag_video("cats_id", "bad")
+
+    _write(catalog, "Cats | cats_id | #cat\n", 2)
+    library.reload()
+    assert library.get_number_of_legal_videos() == 0
+    _write(catalog, full, 3)
+    library.reload()
+    capfd.readouterr()
+    player.show_playlist("pets")
+    out, err = capfd.readouterr()
+
+    assert "Dogs (dogs_id) [#dog]" in out.splitlines()[1]
+    assert library.flagged == flag_store.load() == {"cats_id": "bad"}
+    _write(catalog, "Dogs | dogs_id | #dog\n", 4)
+    library.reload()
+    assert library.get_number_of_legal_videos() == 1
+    assert library.get_number_of_flagged_videos() == 0
+    assert [v.video_id for v in library.search_titles("o")] == ["dogs_id"]
+    playlist_store.close()
+    assert SqlitePlaylistStore(tmp_path / "playlists.db").load() == {
+        "PETS": ("pets", ["dogs_id"])}
+    flag_store.close()
+
+
+def test_watcher_waits_for_the_file_to_settle(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    _write(catalog, "Cats | cats_id | #cat\n", 1)
+    library = VideoLibrary(catalog)
+    watcher = CatalogWatcher(library)
+    _write(catalog, "Cats | cats_id | #cat\nDo", 2)
+    assert watcher.check() is None
+    _write(catalog, "Cats | cats_id | #cat\nDogs | dogs_id | #dog\n", 3)
+    assert watcher.check() is None
+    assert watcher.check().added == ["dogs_id"]
+    assert watcher.check() is None
@@ -0,0 +1,57 @@
+import os
+
+from src import catalog_snapshot
+from src.catalog_snapshot import compile_snapshot, is_snapshot_current
+from src.video_library import VideoLibrary
+
+
+def _write_catalog(tmp_path, text):
+    catalog = tmp_path / "videos.txt"
+    catalog.write_text(text)
+    return catalog
+
+
+def test_snapshot_library_matches_text_library(tmp_path):
+    catalog = _write_catalog(tmp_path, (
+        "Funny Dogs | funny_dogs_video_id |  #dog , #animal\n"
+        "Amazing Cats | amazing_cats_video_id |  #cat , #animal\n"
+        "Video about nothing | nothing_video_id |\n"))
+    library = VideoLibrary(catalog, snapshot=True)
+
+    assert library.get_number_of_videos() == 3
+    video = library.get_video("amazing_cats_video_id")
+    assert video.title == "Amazing Cats"
+    assert video.tags == ("#cat", "#animal")
+    assert library.get_video("nothing_video_id").tags == ()
+    assert library.get_video("does_not_exist") is None
+    assert sorted(v.video_id for v in library.get_all_videos()) == [
+        "amazing_cats_video_id", "funny_dogs_video_id", "nothing_video_id"]
+
+
+def test_snapshot_is_rebuilt_when_source_changes(tmp_path):
+    catalog = _write_catalog(tmp_path, "Old | old_id | #a\n")
+    snapshot = compile_snapshot(catalog)
+    assert is_snapshot_current(catalog, snapshot)
+
+    catalog.write_text("New | new_id | #b\n")
+    os.utime(catalog, ns=(0, 0))
+    assert not is_snapshot_current(catalog, snapshot)
+    library = VideoLibrary(catalog, snapshot=True)
+    assert library.get_video("old_id") is None
+    assert library.get_video("new_id").tags == ("#b",)
+    assert is_snapshot_current(catalog, snapshot)
+
+
+def test_snapshot_survives_touch_without_changes(tmp_path, monkeypatch):
+    catalog = _write_catalog(tmp_path, "Same | same_id | #a\n")
+    snapshot = compile_snapshot(catalog)
+    os.utime(catalog, ns=(0, 0))
+    assert is_snapshot_current(catalog, snapshot)
+
+    def no_hashing(path):
+        raise AssertionError("source hashed again")
+
+    monkeypatch.setattr(catalog_snapshot, "_file_digest", no_hashing)
+    assert is_snapshot_current(catalog, snapshot)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "videos.txt", "videos.txt.snapshot"]
@@ -0,0 +1,37 @@
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.video_player import VideoPlayer
+
+
+def test_commands_ignore_case(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["play", "funny_dogs_video_id"])
+    parser.execute_command(["Number_Of_Videos", "ignored"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Playing video: Funny Dogs" in lines[0]
+    assert "5 videos in the library" in lines[1]
+
+
+def test_wrong_arity_raises_usage():
+    parser = CommandParser(VideoPlayer())
+    with pytest.raises(CommandException, match="followed by video_id"):
+        parser.execute_command(["PLAY"])
+    with pytest.raises(CommandException, match="optional flag reason"):
+        parser.execute_command(["FLAG_VIDEO", "a", "b", "c"])
+
+
+def test_registered_command_runs_and_shows_in_help(capfd):
+    parser = CommandParser(VideoPlayer())
+    calls = []
+    parser.register("echo", calls.append, (1,), "Please enter ECHO text.",
+                    "ECHO <text> - Echoes text.")
+    parser.execute_command(["ECHO", "hi"])
+    parser.execute_command(["HELP"])
+    assert calls == ["hi"]
+    out, err = capfd.readouterr()
+    assert "    ECHO <text> - Echoes text.\n" \
+           "    EXIT - Terminates the program execution." in out
+    with pytest.raises(CommandException, match="Please enter ECHO text."):
+        parser.execute_command(["ECHO"])
@@ -0,0 +1,52 @@
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.command_stats import CommandStats
+from src.output_sink import CollectorSink
+from src.video_player import VideoPlayer
+
+
+def test_percentiles_come_from_the_histogram():
+    stats = CommandStats()
+    for _ in range(90):
+        stats.record("PLAY", 0.001)
+    for _ in range(10):
+        stats.record("PLAY", 0.1, error=True)
+    play = stats.get_command_stats("PLAY")
+    assert play["calls"] == 100
+    assert play["errors"] == 10
+    assert play["mean"] == pytest.approx(0.0109)
+    assert 0.001 <= play["p50"] < 0.001 * 1.2
+    assert 0.001 <= play["p95"] / 100 < 0.001 * 1.2
+    assert stats.get_command_stats("STOP") is None
+    stats.reset()
+    assert stats.get_all_stats() == {}
+
+
+def test_parser_records_commands_and_shows_stats():
+    sink = CollectorSink()
+    stats = CommandStats()
+    parser = CommandParser(VideoPlayer(sink=sink), stats=stats)
+    parser.execute_command(["play", "funny_dogs_video_id"])
+    parser.execute_command(["BOGUS"])
+    with pytest.raises(CommandException):
+        parser.execute_command(["PLAY"])
+    parser.execute_command(["STATS"])
+
+    assert set(stats.get_all_stats()) == {"PLAY", "STATS", "UNKNOWN"}
+    assert stats.get_command_stats("PLAY")["calls"] == 2
+    assert stats.get_command_stats("PLAY")["errors"] == 1
+    assert stats.get_command_stats("UNKNOWN")["errors"] == 1
+    assert sink.lines[2] == "Command statistics (latencies in ms):"
+    assert sink.lines[3].startswith("  PLAY: 2 calls, 1 errors, p50 ")
+    assert sink.lines[4].startswith("  UNKNOWN: 1 calls, 1 errors, p50 ")
+
+
+def test_stats_command_only_exists_when_enabled():
+    sink = CollectorSink()
+    parser = CommandParser(VideoPlayer(sink=sink))
+    parser.execute_command(["STATS"])
+    parser.execute_command(["HELP"])
+    assert "Please enter a valid command" in sink.lines[0]
+    assert sink.lines[2] == "Available commands:"
+    assert not any("STATS" in line for line in sink.lines[1:])
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from src import flag_store
+from src.flag_store import FlagStore
+from src.run import main
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_flags_survive_restart(tmp_path, capfd):
+    store = FlagStore(tmp_path / "flags.log")
+    player = VideoPlayer(VideoLibrary(flag_store=store))
+    player.flag_video("amazing_cats_video_id", "dont_like_cats")
+    player.flag_video("funny_dogs_video_id")
+    player.allow_video("funny_dogs_video_id")
+    store.close()
+
+    store = FlagStore(tmp_path / "flags.log")
+    player = VideoPlayer(VideoLibrary(flag_store=store))
+    capfd.readouterr()
+    player.play_video("amazing_cats_video_id")
+    player.play_video("funny_dogs_video_id")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Cannot play video: Video is currently flagged " \
+           "(reason: dont_like_cats)" in lines[0]
+    assert "Playing video: Funny Dogs" in lines[1]
+    assert [v.video_id for v in player._video_library.search_titles("cat")] \
+        == ["another_cat_video_id"]
+
+
+def test_compaction_keeps_live_flags(tmp_path):
+    store = FlagStore(tmp_path / "flags.log", sync_every=10, compact_min=50)
+    for number in range(200):
+        store.flag(f"video_{number % 7}", f"reason {number}")
+        if number % 3:
+            store.allow(f"video_{number % 7}")
+    expected = store.load()
+    store.close()
+
+    assert (tmp_path / "flags.log").stat().st_size < 200 * 20
+    assert FlagStore(tmp_path / "flags.log").load() == expected
+
+
+def test_torn_log_tail_is_ignored(tmp_path):
+    store = FlagStore(tmp_path / "flags.log")
+    store.flag("a", "first")
+    store.flag("b", "second")
+    store.close()
+    log = tmp_path / "flags.log"
+    log.write_bytes(log.read_bytes()[:-3])
+
+    assert FlagStore(log).load() == {"a": "first"}
+
+
+def test_writer_commits_on_a_timer(tmp_path):
+    store = FlagStore(tmp_path / "flags.log", sync_interval=0.01)
+    store.flag("a", "first")
+    deadline = time.monotonic() + 5
+    while not (tmp_path / "flags.log").stat().st_size and \
+            time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (tmp_path / "flags.log").stat().st_size
+    store.close()
+    store.close()
+
+
+def test_flag_log_option_persists_flags(tmp_path, capfd):
+    commands = tmp_path / "commands.txt"
+    commands.write_text("FLAG_VIDEO amazing_cats_video_id dont_like_cats\n")
+    log = tmp_path / "flags.log"
+    main(["--batch", str(commands), "--flag-log", str(log)])
+    assert FlagStore(log).load() == {
+        "amazing_cats_video_id": "dont_like_cats"}
+
+
+def test_crash_during_compaction_keeps_newest_flags(tmp_path, monkeypatch):
+    store = FlagStore(tmp_path / "flags.log", sync_interval=60)
+    store.flag("y", "first")
+    store.sync()
+    store.allow("y")
+    store.sync()
+    store.flag("y", "second")
+
+    def crash(*args):
+        raise OSError("crashed after the snapshot was moved into place")
+
+    monkeypatch.setattr(flag_store.os, "open", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    monkeypatch.undo()
+
+    assert FlagStore(tmp_path / "flags.log").load() == {"y": "second"}
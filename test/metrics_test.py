@@ -0,0 +1,82 @@
+import os
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.command_parser import CommandParser
+from src.command_stats import CommandStats
+from src.metrics import Metrics, start_metrics_server
+from src.output_sink import CollectorSink
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines()
+                if not line.startswith("#"))
+
+
+def test_metrics_follow_library_and_players():
+    library = VideoLibrary()
+    stats = CommandStats()
+    metrics = Metrics(library, stats)
+    alice = VideoPlayer(library, sink=CollectorSink())
+    bob = VideoPlayer(library, sink=CollectorSink())
+    metrics.add_player(alice)
+    metrics.add_player(bob)
+    parser = CommandParser(alice, stats=stats)
+    parser.execute_command(["CREATE_PLAYLIST", "mine"])
+    parser.execute_command(["ADD_TO_PLAYLIST", "mine", "funny_dogs_video_id"])
+    parser.execute_command(
+        ["ADD_TO_PLAYLIST", "mine", "life_at_google_video_id"])
+    parser.execute_command(["BOGUS"])
+    bob.create_playlist("theirs")
+    bob.add_to_playlist("theirs", "life_at_google_video_id")
+    bob.flag_video("amazing_cats_video_id")
+
+    samples = _samples(metrics.render())
+    assert samples["youtube_videos"] == "5"
+    assert samples["youtube_legal_videos"] == "4"
+    assert samples["youtube_flagged_videos"] == "1"
+    assert samples["youtube_players"] == "2"
+    assert samples["youtube_playlists"] == "2"
+    assert samples["youtube_playlist_entries"] == "3"
+    assert samples['youtube_commands_total{command="ADD_TO_PLAYLIST"}'] == "2"
+    assert samples['youtube_command_errors_total{command="UNKNOWN"}'] == "1"
+    assert 'youtube_command_latency_seconds{command="CREATE_PLAYLIST",' \
+           'quantile="0.99"}' in samples
+
+    bob.clear_playlist("theirs")
+    del bob
+    samples = _samples(metrics.render())
+    assert samples["youtube_players"] == "1"
+    assert samples["youtube_playlist_entries"] == "2"
+
+
+def test_reload_counters(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    catalog.write_text("Cats | cats_id | #cat\n")
+    library = VideoLibrary(catalog)
+    assert library.load_seconds > 0
+    catalog.write_text("Cats | cats_id | #cat\nDogs | dogs_id | #dog\n")
+    os.utime(catalog, ns=(2, 2))
+    library.reload_if_changed()
+    samples = _samples(Metrics(library).render())
+    assert samples["youtube_catalog_reloads_total"] == "1"
+    assert samples["youtube_videos"] == "2"
+    assert "youtube_commands_total" not in samples
+
+
+def test_metrics_are_served_over_http():
+    server = start_metrics_server(Metrics(VideoLibrary()), port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(url + "/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "youtube_videos 5" in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,36 @@
+from src.command_parser import CommandParser
+from src.output_sink import CollectorSink, RecordSink
+from src.video_player import VideoPlayer
+
+COMMANDS = [["SHOW_ALL_VIDEOS"], ["PLAY", "funny_dogs_video_id"],
+            ["CREATE_PLAYLIST", "pets"], ["SHOW_PLAYLIST", "pets"],
+            ["FLAG_VIDEO", "funny_dogs_video_id"], ["BOGUS"], ["HELP"]]
+
+
+def _run(sink=None):
+    parser = CommandParser(VideoPlayer(sink=sink))
+    for command in COMMANDS:
+        parser.execute_command(command)
+
+
+def test_collector_matches_stdout_byte_for_byte(capfd):
+    _run()
+    printed, err = capfd.readouterr()
+    sink = CollectorSink()
+    _run(sink)
+    assert capfd.readouterr() == ("", "")
+    assert sink.getvalue() == printed
+
+
+def test_record_sink_groups_output_by_command():
+    sink = RecordSink()
+    _run(sink)
+    assert [record["command"] for record in sink.records] == COMMANDS
+    assert sink.records[1]["output"] == ["Playing video: Funny Dogs"]
+    assert sink.records[3]["output"] == ["Showing playlist: pets",
+                                         "\tNo videos here yet"]
+    assert len(sink.records[0]["output"]) == 6
+    help_output = sink.records[6]["output"]
+    assert help_output[:2] == ["", "Available commands:"]
+    assert help_output[-1] == ""
+    assert all("\n" not in line for line in help_output)
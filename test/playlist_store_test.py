@@ -0,0 +1,82 @@
+import time
+
+from src.playlist_store import SqlitePlaylistStore
+from src.run import main
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_playlists_survive_restart(tmp_path, capfd):
+    library = VideoLibrary()
+    store = SqlitePlaylistStore(tmp_path / "playlists.db")
+    player = VideoPlayer(library, store)
+    player.create_playlist("my_COOL_playlist")
+    player.create_playlist("doomed")
+    player.add_to_playlist("my_cool_playlist", "funny_dogs_video_id")
+    player.add_to_playlist("my_cool_playlist", "amazing_cats_video_id")
+    player.add_to_playlist("my_cool_playlist", "nothing_video_id")
+    player.remove_from_playlist("my_cool_playlist", "amazing_cats_video_id")
+    player.delete_playlist("doomed")
+    store.close()
+
+    store = SqlitePlaylistStore(tmp_path / "playlists.db")
+    player = VideoPlayer(library, store)
+    capfd.readouterr()
+    player.show_all_playlists()
+    player.show_playlist("my_cool_playlist")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 5
+    assert "my_COOL_playlist" in lines[1]
+    assert "Funny Dogs (funny_dogs_video_id) [#dog #animal]" in lines[3]
+    assert "Video about nothing (nothing_video_id) []" in lines[4]
+
+
+def test_changes_are_committed_in_batches(tmp_path):
+    path = tmp_path / "playlists.db"
+    store = SqlitePlaylistStore(path, batch_size=3, flush_interval=60)
+    store.create("A", "a")
+    store.add("A", "funny_dogs_video_id")
+    assert SqlitePlaylistStore(path).load() == {}
+
+    store.add("A", "nothing_video_id")
+    assert SqlitePlaylistStore(path).load() == {
+        "A": ("a", ["funny_dogs_video_id", "nothing_video_id"])}
+    store.clear("A")
+    store.flush()
+    assert SqlitePlaylistStore(path).load() == {"A": ("a", [])}
+
+
+def test_changes_are_committed_on_a_timer(tmp_path):
+    path = tmp_path / "playlists.db"
+    store = SqlitePlaylistStore(path, flush_interval=0.01)
+    store.create("A", "a")
+    reader = SqlitePlaylistStore(path, flush_interval=60)
+    deadline = time.monotonic() + 5
+    while not reader.load() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert reader.load() == {"A": ("a", [])}
+    reader.close()
+    store.close()
+    store.close()
+
+
+def test_playlist_db_option_keeps_playlists(tmp_path, capfd):
+    commands = tmp_path / "commands.txt"
+    commands.write_text("CREATE_PLAYLIST mine\n"
+                        "ADD_TO_PLAYLIST mine funny_dogs_video_id\n")
+    database = tmp_path / "playlists.db"
+    main(["--batch", str(commands), "--playlist-db", str(database)])
+    assert SqlitePlaylistStore(database).load() == {
+        "MINE": ("mine", ["funny_dogs_video_id"])}
+
+
+def test_duplicate_rows_load_as_one_entry(tmp_path):
+    store = SqlitePlaylistStore(tmp_path / "playlists.db")
+    store.create("MIX", "mix")
+    store.add("MIX", "funny_dogs_video_id")
+    store.add("MIX", "funny_dogs_video_id")
+    player = VideoPlayer(VideoLibrary(), store)
+    assert list(player.playlists["MIX"]) == ["funny_dogs_video_id"]
+    assert player.get_number_of_playlist_entries() == 1
+    store.close()
@@ -0,0 +1,37 @@
+from src.video_playlist import Playlist
+from src.video_player import VideoPlayer
+
+
+def test_playlist_keeps_insertion_order():
+    playlist = Playlist("my_playlist")
+    playlist.extend(["c", "a"])
+    playlist.add("b")
+    playlist.remove("a")
+    playlist.add("a")
+
+    assert list(playlist) == ["c", "b", "a"]
+    assert list(playlist.videos) == ["c", "b", "a"]
+    assert "b" in playlist
+    assert "d" not in playlist
+    assert len(playlist) == 3
+
+    playlist.clear()
+    assert len(playlist) == 0
+
+
+def test_player_tracks_playlists_containing_a_video():
+    player = VideoPlayer()
+    player.create_playlist("B_list")
+    player.create_playlist("a_list")
+    player.create_playlist("other")
+    player.add_to_playlist("b_list", "amazing_cats_video_id")
+    player.add_to_playlist("a_list", "amazing_cats_video_id")
+    player.add_to_playlist("other", "funny_dogs_video_id")
+
+    assert player.get_playlists_with_video("amazing_cats_video_id") == [
+        "a_list", "B_list"]
+    player.remove_from_playlist("a_list", "amazing_cats_video_id")
+    player.delete_playlist("b_list")
+    assert player.get_playlists_with_video("amazing_cats_video_id") == []
+    player.clear_playlist("other")
+    assert player.get_playlists_with_video("funny_dogs_video_id") == []
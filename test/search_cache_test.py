@@ -0,0 +1,65 @@
+import os
+
+from src.metrics import Metrics
+from src.search_cache import SearchCache
+from src.video_library import VideoLibrary
+
+
+def test_least_recently_used_results_are_evicted():
+    cache = SearchCache(max_entries=2)
+    cache.put(("TITLE", "A"), 0, ["a"])
+    cache.put(("TITLE", "B"), 0, ["b"])
+    assert cache.get(("TITLE", "A"), 0) == ("a",)
+    cache.put(("TITLE", "C"), 0, ["c"])
+    assert cache.get(("TITLE", "B"), 0) is None
+    assert cache.get(("TITLE", "A"), 0) == ("a",)
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+
+
+def test_memory_bound_and_stale_generations():
+    cache = SearchCache(max_entries=100, max_bytes=10000)
+    cache.put(("TAG", "#BIG"), 0, ["id"] * 2000)
+    assert len(cache) == 0
+    for number in range(10):
+        cache.put(("TAG", f"#{number}"), 0, ["id"] * 100)
+    assert cache.size_bytes <= 10000
+    assert len(cache) < 10
+    assert cache.get(("TAG", "#9"), 1) is None
+    assert cache.get(("TAG", "#9"), 0) is None
+
+
+def test_library_serves_repeated_searches_from_cache(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    catalog.write_text("Cats | cats_id | #cat\n"
+                       "More Cats | more_cats_id | #cat\n")
+    os.utime(catalog, ns=(1, 1))
+    library = VideoLibrary(catalog)
+    cache = library.search_cache
+
+    assert [v.video_id for v in library.search_titles("cats")] == [
+        "cats_id", "more_cats_id"]
+    assert [v.video_id for v in library.search_titles("CATS")] == [
+        "cats_id", "more_cats_id"]
+    assert library.search_titles_page("Cats", 1, 1).videos[0].video_id == \
+        "more_cats_id"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    library.flag_video("cats_id", "reason")
+    assert [v.video_id for v in library.search_titles("cats")] == [
+        "more_cats_id"]
+    assert library.flag_video("cats_id", "again") is False
+    assert len(library.get_videos_with_tag("#CAT")) == 1
+    assert len(library.get_videos_with_tag("#cat")) == 1
+    assert (cache.hits, cache.misses) == (3, 3)
+
+    catalog.write_text("Cats | cats_id | #cat\n")
+    os.utime(catalog, ns=(2, 2))
+    library.reload_if_changed()
+    assert library.search_titles("cats") == []
+    assert "youtube_search_cache_misses_total 4" in Metrics(library).render()
+
+
+def test_cache_can_be_disabled():
+    library = VideoLibrary(cache_entries=0)
+    assert library.search_cache is None
+    assert len(library.search_titles("cat")) == 2
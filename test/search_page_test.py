@@ -0,0 +1,64 @@
+from benchmarks.synthetic import write_catalog
+from src.command_parser import CommandParser
+from src.output_sink import CollectorSink
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_pages_match_full_results(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    write_catalog(catalog, 2000, tags=20)
+    library = VideoLibrary(catalog)
+    library.flag_video("video_7", "reason")
+    # Rare and common terms and tags take the heap and the walk paths.
+    for term in ("cat", "python tutorial", "cooking 1", "zzz"):
+        full = library.search_titles(term)
+        for limit, offset in ((1, 0), (10, 0), (10, 30), (500, 1000)):
+            page = library.search_titles_page(term, limit, offset)
+            assert page.total == len(full)
+            assert page.videos == full[offset:offset + limit]
+    for tag in ("#tag0", "#tag19", "#missing"):
+        full = library.get_videos_with_tag(tag)
+        page = library.get_videos_with_tag_page(tag, 25, 10)
+        assert (page.videos, page.total) == (full[10:35], len(full))
+
+
+def test_cursor_continues_after_last_video(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    write_catalog(catalog, 500)
+    library = VideoLibrary(catalog)
+    full = library.search_titles("game")
+    first = library.search_titles_page("game", 20)
+    last = first.videos[-1]
+    second = library.search_titles_page("game", 20,
+                                        after=(last.title, last.video_id))
+    assert second.videos == full[20:40]
+
+
+def test_search_pages_are_numbered_and_playable():
+    sink = CollectorSink()
+    parser = CommandParser(VideoPlayer(read_answer=lambda: "3", sink=sink))
+    parser.execute_command(["SEARCH_VIDEOS", "a", "limit", "2",
+                            "PAGE", "2"])
+    assert sink.lines[:4] == [
+        "Here are the results for a (3-4 of 4):",
+        "\t3) Life at Google (life_at_google_video_id) [#google #career]",
+        "\t4) Video about nothing (nothing_video_id) []",
+        "Would you like to play any of the above? If yes, specify the "
+        "number of the video."]
+    assert sink.lines[-1] == "Playing video: Life at Google"
+
+    sink.lines.clear()
+    parser.execute_command(["SEARCH_VIDEOS_WITH_TAG", "#animal", "PAGE", "9"])
+    parser.execute_command(["SEARCH_VIDEOS", "cat", "LIMIT", "0"])
+    parser.execute_command(["SEARCH_VIDEOS", "cat", "LIMIT", "1",
+                            "LIMIT", "2"])
+    parser.execute_command(["SEARCH_VIDEOS", "cat", "LIMIT", "\u00b2"])
+    assert sink.lines == [
+        "No search results for #animal on this page, there are 3 in total",
+        "Cannot search videos: Please give LIMIT and PAGE followed by "
+        "positive numbers",
+        "Cannot search videos: Please give LIMIT and PAGE followed by "
+        "positive numbers",
+        "Cannot search videos: Please give LIMIT and PAGE followed by "
+        "positive numbers"]
@@ -0,0 +1,83 @@
+import asyncio
+
+from src.server import start_server
+from src.video_library import VideoLibrary
+
+
+async def _read_reply(reader):
+    lines = []
+    while True:
+        line = (await reader.readline()).decode().rstrip("\n")
+        if line in (".", ".?"):
+            return lines, line
+        lines.append(line)
+
+
+async def _talk(port, *lines):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    replies = [await _read_reply(reader)]
+    for line in lines:
+        writer.write(line.encode() + b"\n")
+        await writer.drain()
+        replies.append(await _read_reply(reader))
+    writer.close()
+    return replies
+
+
+def test_sessions_share_flags_and_answer_prompts():
+    async def scenario():
+        server = await start_server(VideoLibrary(), port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            first, second = await asyncio.gather(
+                _talk(port, "FLAG_VIDEO funny_dogs_video_id",
+                      "CREATE_PLAYLIST mine"),
+                _talk(port, "SEARCH_VIDEOS cat", "2", "SHOW_PLAYING",
+                      "PLAY", "EXIT"))
+            third = await _talk(port, "PLAY funny_dogs_video_id",
+                                "SHOW_ALL_PLAYLISTS")
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first[0] == ([
+        "Hello and welcome to YouTube, what would you like to do?",
+        "Enter HELP for list of available commands or EXIT to terminate."],
+        ".")
+    assert first[1] == (["Successfully flagged video: Funny Dogs "
+                         "(reason: Not supplied)"], ".")
+
+    lines, terminator = second[1]
+    assert terminator == ".?"
+    assert lines[0] == "Here are the results for cat:"
+    assert second[2] == (["Playing video: Another Cat Video"], ".")
+    assert second[3][0][0].startswith("Currently playing: Another Cat Video")
+    assert second[4] == (
+        ["Please enter PLAY command followed by video_id."], ".")
+    assert second[5][0][0].startswith("YouTube has now terminated")
+
+    assert third[1] == (["Cannot play video: Video is currently flagged "
+                         "(reason: Not supplied)"], ".")
+    assert third[2] == (["No playlists exist yet"], ".")
+
+
+def test_bad_lines_get_error_replies():
+    async def scenario():
+        server = await start_server(VideoLibrary(), port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            replies = [await _read_reply(reader)]
+            writer.write(b"PLAY \xff\nNUMBER_OF_VIDEOS\n")
+            replies.append(await _read_reply(reader))
+            replies.append(await _read_reply(reader))
+            writer.write(b"x" * (1 << 17) + b"\n")
+            replies.append(await _read_reply(reader))
+            replies.append(await reader.read())
+            writer.close()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert replies[1] == (["Line is not valid UTF-8"], ".")
+    assert replies[2] == (["5 videos in the library"], ".")
+    assert replies[3] == (["Line is too long"], ".")
+    assert replies[4] == b""
@@ -0,0 +1,58 @@
+import pytest
+
+from src import video_library
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_shared_library_is_loaded_once(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    catalog.write_text("Funny Dogs | funny_dogs_video_id | #dog\n")
+    try:
+        library = VideoLibrary.shared(catalog, lazy=True)
+        assert library is VideoLibrary.shared(
+            str(tmp_path / "." / "videos.txt"))
+        assert library is VideoLibrary.shared(catalog, lazy=True)
+        with pytest.raises(ValueError):
+            VideoLibrary.shared(catalog, lazy=False)
+    finally:
+        del video_library._shared_libraries[catalog.resolve()]
+
+
+def test_flagging_stops_the_video_in_other_sessions(capfd):
+    library = VideoLibrary()
+    alice = VideoPlayer(library)
+    bob = VideoPlayer(library)
+    alice.play_video("amazing_cats_video_id")
+    bob.play_video("amazing_cats_video_id")
+    bob.flag_video("amazing_cats_video_id", "dont_like_cats")
+    alice.show_playing()
+    bob.show_playing()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[2:] == [
+        "Stopping video: Amazing Cats",
+        "Successfully flagged video: Amazing Cats (reason: dont_like_cats)",
+        "No video is currently playing",
+        "No video is currently playing"]
+
+
+def test_sessions_share_flags_but_not_state(capfd):
+    library = VideoLibrary()
+    alice = VideoPlayer(library)
+    bob = VideoPlayer(library)
+
+    alice.create_playlist("my_playlist")
+    alice.play_video("funny_dogs_video_id")
+    bob.flag_video("amazing_cats_video_id")
+    alice.play_video("amazing_cats_video_id")
+    bob.show_playing()
+    bob.show_all_playlists()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 6
+    assert "Playing video: Funny Dogs" in lines[1]
+    assert "Cannot play video: Video is currently flagged " \
+           "(reason: Not supplied)" in lines[3]
+    assert "No video is currently playing" in lines[4]
+    assert "No playlists exist yet" in lines[5]
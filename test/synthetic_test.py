@@ -0,0 +1,34 @@
+import io
+
+from benchmarks.synthetic import generate_commands, write_catalog
+from src.run import run_batch
+from src.video_library import VideoLibrary
+
+
+def test_catalog_is_reproducible_and_loads(tmp_path):
+    first, second = tmp_path / "first.txt", tmp_path / "second.txt"
+    write_catalog(first, 500, seed=7, tags=50, zipf=1.2, title_words=(3, 3))
+    write_catalog(second, 500, seed=7, tags=50, zipf=1.2, title_words=(3, 3))
+    assert first.read_text() == second.read_text()
+
+    library = VideoLibrary(first)
+    assert library.get_number_of_videos() == 500
+    assert all(len(v.title.split()) == 4 for v in library.get_all_videos())
+    popular = len(library.get_videos_with_tag("#tag0"))
+    rare = len(library.get_videos_with_tag("#tag49"))
+    assert popular > 5 * max(rare, 1)
+
+
+def test_commands_follow_the_mix_and_run(tmp_path, monkeypatch):
+    catalog = tmp_path / "videos.txt"
+    write_catalog(catalog, 200, seed=1)
+    script = generate_commands(300, 200, seed=1, zipf=1.0)
+    assert script == generate_commands(300, 200, seed=1, zipf=1.0)
+    assert all(line.startswith("PLAY video_")
+               for line in generate_commands(50, 200, mix={"PLAY": 1}))
+
+    monkeypatch.setattr("src.video_player.VideoLibrary",
+                        lambda: VideoLibrary(catalog))
+    output = io.StringIO()
+    assert run_batch(script, output, answer="No") == 300
+    assert "Please enter" not in output.getvalue()
@@ -0,0 +1,168 @@
+import os
+import random
+import threading
+
+from src.output_sink import CollectorSink
+from src.rwlock import ReadWriteLock
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+THREADS = 8
+ROUNDS = 300
+
+
+def _write_catalog(catalog, size, mtime):
+    catalog.write_text("".join(
+        f"Video {i} about {'cats' if i % 2 else 'dogs'} | id_{i} | "
+        f"#tag{i % 5} , #all\n" for i in range(size)))
+    os.utime(catalog, ns=(mtime, mtime))
+
+
+def _run_threads(target, count=THREADS):
+    errors = []
+
+    def run(seed):
+        try:
+            target(random.Random(seed))
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(seed,))
+               for seed in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def _assert_consistent(library):
+    legal = {v.video_id for v in library.get_legal_videos()}
+    assert legal == {v.video_id for v in library.get_all_videos()} - set(
+        library.flagged)
+    assert library.get_number_of_legal_videos() == len(legal)
+    assert {v.video_id for v in library.get_videos_with_tag("#all")} == legal
+    assert {v.video_id for v in library.search_titles("video")} == legal
+    assert set(library._legal_ids) == legal
+    for _ in range(50):
+        assert library.get_random_legal_video().video_id in legal
+
+
+def test_concurrent_sessions_keep_library_consistent(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    _write_catalog(catalog, 200, 1)
+    library = VideoLibrary(catalog)
+
+    def session(rng):
+        player = VideoPlayer(library, read_answer=lambda: "No",
+                             sink=CollectorSink())
+        player.create_playlist("mine")
+        for _ in range(ROUNDS):
+            video_id = f"id_{rng.randrange(200)}"
+            action = rng.randrange(8)
+            if action == 0:
+                player.flag_video(video_id, "reason")
+            elif action == 1:
+                player.allow_video(video_id)
+            elif action == 2:
+                player.search_videos(rng.choice(["cats", "dogs", "video 1"]))
+            elif action == 3:
+                player.search_videos_tag(f"#tag{rng.randrange(5)}")
+            elif action == 4:
+                player.play_random_video()
+            elif action == 5:
+                player.show_all_videos()
+            elif action == 6:
+                player.add_to_playlist("mine", video_id)
+            else:
+                player.play_video(video_id)
+
+    _run_threads(session)
+    _assert_consistent(library)
+
+
+def test_flag_reports_one_winner_per_video():
+    library = VideoLibrary()
+    player_sinks = []
+
+    def session(rng):
+        sink = CollectorSink()
+        player_sinks.append(sink)
+        VideoPlayer(library, sink=sink).flag_video("funny_dogs_video_id")
+
+    _run_threads(session)
+    messages = [line for sink in player_sinks for line in sink.lines]
+    assert messages.count(
+        "Successfully flagged video: Funny Dogs (reason: Not supplied)") == 1
+    assert messages.count(
+        "Cannot flag video: Video is already flagged") == THREADS - 1
+
+
+def test_reload_during_searches(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    _write_catalog(catalog, 200, 1)
+    library = VideoLibrary(catalog)
+    library.search_titles("video")
+    stop = threading.Event()
+
+    def reader(rng):
+        while not stop.is_set():
+            library.search_titles(rng.choice(["cats", "dogs"]))
+            library.get_videos_with_tag("#all")
+            library.get_random_legal_video()
+
+    threads = [threading.Thread(target=reader, args=(random.Random(i),))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for version in range(2, 12):
+            _write_catalog(catalog, 150 + 10 * version, version)
+            library.flag_video(f"id_{version}", "reason")
+            library.reload_if_changed()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert library.get_number_of_videos() == 260
+    _assert_consistent(library)
+
+
+def test_waiting_writer_blocks_new_readers():
+    lock = ReadWriteLock()
+    order = []
+    lock.acquire_read()
+    writer = threading.Thread(target=lambda: (
+        lock.acquire_write(), order.append("write"), lock.release_write()))
+    writer.start()
+    while not lock._writers_waiting:
+        pass
+    reader = threading.Thread(target=lambda: (
+        lock.acquire_read(), order.append("read"), lock.release_read()))
+    reader.start()
+    lock.release_read()
+    writer.join()
+    reader.join()
+    assert order == ["write", "read"]
+
+
+
+def test_other_sessions_changes_apply_before_the_next_command():
+    library = VideoLibrary()
+    flagger = VideoPlayer(library, sink=CollectorSink())
+
+    class FlaggingSink(CollectorSink):
+        def write(self, line):
+            super().write(line)
+            if line.startswith("Pausing"):
+                flagger.flag_video("funny_dogs_video_id")
+                assert player.playing_id == "funny_dogs_video_id"
+
+    sink = FlaggingSink()
+    player = VideoPlayer(library, sink=sink)
+    player.play_video("funny_dogs_video_id")
+    player.pause_video()
+    player.show_playing()
+    assert sink.lines == ["Playing video: Funny Dogs",
+                          "Pausing video: Funny Dogs",
+                          "No video is currently playing"]
@@ -0,0 +1,31 @@
+from src.title_index import TitleIndex
+from src.video_library import VideoLibrary
+
+
+def test_title_index_finds_substrings():
+    index = TitleIndex()
+    index.add("a", "Amazing Cats")
+    index.add("b", "Another Cat Video")
+    index.add("c", "AAA")
+
+    assert index.search("cat") == {"a", "b"}
+    assert index.search("CATS") == {"a"}
+    assert index.search("g c") == {"a"}
+    assert index.search("aaaa") == set()
+    assert index.search("aaa") == {"c"}
+    assert index.search("missing") == set()
+
+
+def test_title_index_removes_videos():
+    index = TitleIndex()
+    index.add("a", "Amazing Cats")
+    index.remove("a")
+    assert index.search("cat") == set()
+    assert len(index) == 0
+
+
+def test_search_titles_skips_flagged_videos():
+    library = VideoLibrary()
+    library.flag_video("amazing_cats_video_id", "dont_like_cats")
+    assert [v.video_id for v in library.search_titles("cat")] == [
+        "another_cat_video_id"]
@@ -0,0 +1,66 @@
+from src.video_library import VideoLibrary
+from src.video_catalog import load_catalog, load_catalog_parallel
+from src.video import Video
+
+
+def test_lazy_library_has_all_videos():
+    library = VideoLibrary(lazy=True)
+    assert library.get_number_of_videos() == 5
+    assert library._videos.number_materialised() == 0
+
+
+def test_lazy_library_parses_on_demand():
+    library = VideoLibrary(lazy=True)
+    video = library.get_video("amazing_cats_video_id")
+
+    assert video is not None
+    assert video.title == "Amazing Cats"
+    assert set(video.tags) == {"#cat", "#animal"}
+    assert library.get_video("nothing_video_id").tags == ()
+    assert library.get_video("does_not_exist") is None
+    assert library._videos.number_materialised() == 2
+
+
+def test_lazy_library_matches_eager(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    catalog.write_text('"Quoted | title" | quoted_id | #a , #b\n'
+                       "\n"
+                       "Plain | plain_id |\n")
+    lazy = VideoLibrary(catalog, lazy=True)
+    assert lazy.get_number_of_videos() == 2
+    assert lazy.get_video("quoted_id").title == "Quoted | title"
+    assert lazy.get_video("quoted_id").tags == ("#a", "#b")
+    assert lazy.get_video("plain_id").tags == ()
+
+
+def test_lazy_library_accepts_added_videos():
+    library = VideoLibrary(lazy=True)
+    library.add_video(Video("Baby Sharks", "baby_sharks_video_id", []))
+
+    assert library.get_number_of_videos() == 6
+    assert library.get_all_videos_by_title()[2].title == "Baby Sharks"
+    assert library.get_video("baby_sharks_video_id").title == "Baby Sharks"
+
+
+def test_parallel_load_matches_sequential_load(tmp_path, caplog):
+    catalog = tmp_path / "videos.txt"
+    rows = [f"Video {number} | video_{number % 40} | #tag{number % 3} , #all"
+            for number in range(100)]
+    catalog.write_text("\n".join(rows) + "\n")
+
+    sequential = load_catalog(catalog)
+    parallel = load_catalog_parallel(catalog, workers=4, min_chunk_size=64)
+    assert [record.getMessage().split(": ")[1].split()[0]
+            for record in caplog.records] == ["60", "60"]
+    assert list(parallel) == list(sequential)
+    for video_id, video in sequential.items():
+        assert parallel[video_id].title == video.title
+        assert parallel[video_id].tags == video.tags
+    assert parallel["video_1"].tags[1] is parallel["video_2"].tags[1]
+    # Rows 60 and 81 are parsed in different chunks.
+    assert parallel["video_20"].tags is parallel["video_1"].tags
+
+
+def test_parallel_library_loads_bundled_catalog():
+    library = VideoLibrary(workers=2)
+    assert library.get_number_of_videos() == 5
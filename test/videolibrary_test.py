@@ -1,4 +1,5 @@
 from src.video_library import VideoLibrary
+from src.video import Video
 
 
 def test_library_has_all_videos():
@@ -24,3 +25,63 @@ def test_parses_video_correctly_without_tags():
     assert video.title == "Video about nothing"
     assert video.video_id == "nothing_video_id"
     assert video.tags == ()
+
+
+def test_videos_with_tag_ignores_case():
+    library = VideoLibrary()
+    videos = library.get_videos_with_tag("#ANIMAL")
+
+    assert {v.video_id for v in videos} == {
+        "amazing_cats_video_id", "another_cat_video_id",
+        "funny_dogs_video_id"}
+    assert library.get_videos_with_tag("#missing") == []
+
+
+def test_videos_with_tag_follows_flags():
+    library = VideoLibrary()
+    library.flag_video("amazing_cats_video_id", "dont_like_cats")
+    assert [v.video_id for v in library.get_videos_with_tag("#cat")] == [
+        "another_cat_video_id"]
+
+    library.allow_video("amazing_cats_video_id")
+    assert {v.video_id for v in library.get_videos_with_tag("#cat")} == {
+        "amazing_cats_video_id", "another_cat_video_id"}
+
+
+def test_random_legal_video_skips_flagged():
+    library = VideoLibrary()
+    for video_id in ("funny_dogs_video_id", "amazing_cats_video_id",
+                     "life_at_google_video_id", "nothing_video_id"):
+        library.flag_video(video_id, "reason")
+    for _ in range(10):
+        assert library.get_random_legal_video().video_id == \
+            "another_cat_video_id"
+    assert library.get_number_of_legal_videos() == 1
+
+    library.flag_video("another_cat_video_id", "reason")
+    assert library.get_random_legal_video() is None
+    library.allow_video("nothing_video_id")
+    assert library.get_random_legal_video().video_id == "nothing_video_id"
+
+
+def test_videos_by_title_include_added_videos():
+    library = VideoLibrary()
+    library.add_video(Video("Baby Sharks", "baby_sharks_video_id", ["#fish"]))
+
+    assert [v.title for v in library.get_all_videos_by_title()] == [
+        "Amazing Cats", "Another Cat Video", "Baby Sharks", "Funny Dogs",
+        "Life at Google", "Video about nothing"]
+    assert [v.title for v in library.search_titles("a")][:3] == [
+        "Amazing Cats", "Another Cat Video", "Baby Sharks"]
+    assert library.get_videos_with_tag("#FISH")[0].title == "Baby Sharks"
+    assert library.get_number_of_videos() == 6
+
+
+def test_videos_share_tag_storage():
+    library = VideoLibrary()
+    cats = library.get_video("amazing_cats_video_id")
+    other_cats = library.get_video("another_cat_video_id")
+
+    assert not hasattr(cats, "__dict__")
+    assert cats.tags is other_cats.tags
+    assert library.get_video("funny_dogs_video_id").tags[1] is cats.tags[1]